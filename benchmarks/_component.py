@@ -0,0 +1,28 @@
+"""Import the integration's Home Assistant independent modules.
+
+The transport and parser modules (``api``, ``parser``, ...) do not depend on
+Home Assistant, but the package ``__init__`` does. This registers the
+component directory as a bare package so those modules can be imported
+from benchmarks without a Home Assistant install.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+COMPONENT_DIR = (
+    Path(__file__).resolve().parent.parent / "custom_components" / "felicity_battery"
+)
+PACKAGE = "felicity_battery"
+
+
+def load(name: str) -> types.ModuleType:
+    """Return submodule ``name`` of the integration (e.g. ``"parser"``)."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [str(COMPONENT_DIR)]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
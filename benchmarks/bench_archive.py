@@ -0,0 +1,79 @@
+"""Telemetry archive benchmark: size on disk and scan speed.
+
+Writes DAYS of synthetic polls (recorded response with a varying current
+and jittering cell voltages) into a temporary archive, one block per
+flush as the coordinator does, then reads it back through the mmap
+reader. Reports bytes per poll against the JSON response, rows scanned
+per second, and checks that every value read back matches what was
+written.
+
+    python benchmarks/bench_archive.py [--days 31] [--interval 30] [--flush 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+
+from _component import load
+import payloads
+
+archive = load("archive")
+
+
+def polls(days: int, interval: int, seed: int = 1):
+    """Yield (unix time, response) of synthetic polls."""
+    rng = random.Random(seed)
+    base = json.loads(payloads.REAL_JSON)
+    cells = list(base["BatcelList"][0])
+    start = 1_700_000_000
+    for i in range(days * 86400 // interval):
+        data = json.loads(payloads.REAL_JSON)
+        data["Batt"][1][0] = rng.randint(-500, 500)
+        data["BatcelList"][0] = [c + rng.randint(-3, 3) for c in cells]
+        yield start + i * interval, data
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("--days", type=int, default=31)
+    args.add_argument("--interval", type=int, default=30, help="poll interval, s")
+    args.add_argument("--flush", type=int, default=300, help="flush interval, s")
+    opts = args.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = archive.TelemetryArchive(directory)
+        expected = []
+        per_flush = max(1, opts.flush // opts.interval)
+        for timestamp, data in polls(opts.days, opts.interval):
+            store.add(timestamp, data)
+            expected.append((timestamp, store.pending[-1][1]))
+            if len(store.pending) >= per_flush:
+                store.write(store.take())
+        store.write(store.take())
+
+        began = time.perf_counter()
+        result = store.read()
+        seconds = time.perf_counter() - began
+
+    rows = store.rows_written
+    print(f"  polls               {rows}")
+    print(f"  archive bytes/poll  {store.bytes_written / rows:.1f}")
+    print(f"  json bytes/poll     {len(payloads.REAL_JSON)}")
+    print(f"  scan                {seconds:.3f} s, {rows / seconds:,.0f} polls/s")
+
+    names = [name for name, *_ in archive.HISTORY_COLUMNS]
+    for index, (timestamp, values) in enumerate(expected):
+        row = [result[name][index] for name in names]
+        row += [cells[index] for cells in result["cells"]]
+        if result["time"][index] != timestamp or row != values:
+            print(f"\npoll {index} differs after reading back")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
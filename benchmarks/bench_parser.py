@@ -0,0 +1,136 @@
+"""Parser throughput and regression benchmark over the payload corpus.
+
+For every payload in ``corpus/real`` and ``corpus/settings`` runs each
+parser implementation, checks that its result equals the reference
+implementation (the first one listed) and reports:
+
+- parses per second;
+- peak temporary memory of one parse (tracemalloc; CPython has no counter
+  of allocation events, so this is the closest per-parse allocation cost);
+- memory blocks kept by the parsed result.
+
+Exits with status 1 if any implementation disagrees with the reference, so
+it can gate parser changes.
+
+    python benchmarks/bench_parser.py [-n ITERATIONS] [--check] [-k FILTER]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable
+
+from _component import load
+import payloads
+
+parser = load("parser")
+
+Parser = Callable[[str], Any]
+
+# First entry of each table is the reference implementation
+REAL_PARSERS: dict[str, Parser] = {
+    "regex": parser.parse_real_payload_regex,
+    "fast": parser.parse_real_payload,
+    "tolerant": lambda text: parser.extract_real_fields(parser.tolerant_loads(text)),
+}
+
+def parse_settings_chunked(text: str, size: int = 64) -> dict[str, Any]:
+    """Feed the streaming decoder in socket-sized pieces."""
+    decoder = parser.SettingsDecoder()
+    for start in range(0, len(text), size):
+        decoder.feed(text[start : start + size])
+    return decoder.close()
+
+
+SETTINGS_PARSERS: dict[str, Parser] = {
+    "splitter": parser.parse_settings_payload_splitter,
+    "stream": parser.parse_settings_payload,
+    "chunked": parse_settings_chunked,
+}
+
+
+def memory_profile(func: Parser, payload: str) -> tuple[int, int]:
+    """Return (peak temporary bytes, blocks kept by the result) of one call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func(payload)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    kept = sum(
+        stat.count_diff
+        for stat in after.compare_to(before, "filename")
+        if stat.count_diff > 0
+    )
+    del result
+    return peak - base, kept
+
+
+def run_table(
+    kind: str, parsers: dict[str, Parser], opts: argparse.Namespace
+) -> int:
+    """Benchmark one corpus directory; return the number of mismatches."""
+    names = list(parsers)
+    reference = parsers[names[0]]
+    mismatches = 0
+
+    print(f"\n{kind} payloads (reference: {names[0]})")
+    header = f"  {'payload':<32}{'bytes':>6}"
+    for name in names:
+        header += f" | {name:>10} {'parse/s':>8} {'peakB':>6} {'kept':>5}"
+    print(header)
+
+    for label, payload in payloads.corpus(kind).items():
+        if opts.filter and opts.filter not in label:
+            continue
+        expected = reference(payload)
+        row = f"  {label[:32]:<32}{len(payload):>6}"
+        for name in names:
+            func = parsers[name]
+            same = func(payload) == expected
+            if not same:
+                mismatches += 1
+            mark = "ok" if same else "DIFF"
+            if opts.check:
+                row += f" | {name:>10} {mark:>8}"
+                continue
+            seconds = timeit.timeit(lambda: func(payload), number=opts.iterations)
+            peak, kept = memory_profile(func, payload)
+            row += (
+                f" | {mark:>10} {opts.iterations / seconds:8.0f}"
+                f" {peak:6d} {kept:5d}"
+            )
+        print(row)
+
+    return mismatches
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("-n", "--iterations", type=int, default=5000)
+    args.add_argument("-k", "--filter", help="only payloads containing FILTER")
+    args.add_argument(
+        "--check", action="store_true", help="equivalence check only, no timing"
+    )
+    opts = args.parse_args()
+
+    mismatches = run_table("real", REAL_PARSERS, opts)
+    mismatches += run_table("settings", SETTINGS_PARSERS, opts)
+
+    if mismatches:
+        print(f"\n{mismatches} result(s) differ from the reference parser")
+        sys.exit(1)
+    print("\nall implementations agree with the reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Receive path benchmark: stream accumulation vs the reusable buffer.
+
+Feeds recorded responses, split into chunks, through
+
+- ``stream``: the former path, ``data += reader.read()`` per chunk, then
+  slicing and decoding the bytes;
+- ``buffer``: ``_ReceiveProtocol``, which the transport fills in place
+  (``get_buffer``/``buffer_updated``) and decodes once from a slice.
+
+Reports responses per second, peak temporary memory per response and
+memory blocks kept (tracemalloc, see ``bench_parser.py``), and checks
+that both paths return the same text.
+
+    python benchmarks/bench_receive.py [-n ITERATIONS] [--chunk-size 64 1460]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from typing import Callable
+
+from _component import load
+from bench_parser import memory_profile
+import payloads
+
+api = load("api")
+
+Receiver = Callable[[bytes], str]
+
+
+def receive_stream(payload: bytes, chunk_size: int) -> str:
+    """The former path: grow ``bytes`` per chunk, then slice and decode.
+
+    Models asyncio streams: the transport hands ``data_received`` a new
+    ``bytes``, StreamReader appends it to its ``bytearray`` and ``read()``
+    copies it out again.
+    """
+    scanner = api._FrameScanner()
+    stream_buffer = bytearray()
+    data = b""
+    for start in range(0, len(payload), chunk_size):
+        stream_buffer.extend(payload[start : start + chunk_size])
+        chunk = bytes(stream_buffer[:4096])  # reader.read(4096)
+        del stream_buffer[:4096]
+        data += chunk
+        scanner.feed(chunk)
+    return data[: scanner.end].decode("ascii", errors="ignore").strip()
+
+
+def receive_buffer(payload: bytes, chunk_size: int) -> str:
+    """``_ReceiveProtocol``; slice assignment stands in for recv_into."""
+    protocol = RECEIVER
+    protocol.reset()
+    source = memoryview(payload)
+    for start in range(0, len(payload), chunk_size):
+        chunk = source[start : start + chunk_size]
+        buffer = protocol.get_buffer(-1)
+        buffer[: len(chunk)] = chunk
+        protocol.buffer_updated(len(chunk))
+    scanner = protocol.scanner
+    return protocol.text(max(scanner.start, 0), scanner.end).strip()
+
+
+# Один протокол на все замеры, как одно постоянное соединение
+RECEIVER = api._ReceiveProtocol()
+
+RECEIVERS: dict[str, Callable[[bytes, int], str]] = {
+    "stream": receive_stream,
+    "buffer": receive_buffer,
+}
+
+
+def responses() -> dict[str, bytes]:
+    settings = "".join(payloads.SETTINGS)
+    return {
+        "real": payloads.REAL_JSON.encode(),
+        "settings (3 objects)": settings.encode(),
+        # Крупный ответ, чтобы было видно квадратичное копирование
+        "real x16 concatenated": (payloads.REAL_JSON * 16).encode(),
+    }
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("-n", "--iterations", type=int, default=5000)
+    args.add_argument("--chunk-size", type=int, nargs="+", default=[64, 1460])
+    opts = args.parse_args()
+
+    names = list(RECEIVERS)
+    mismatches = 0
+    header = f"  {'response':<24}{'bytes':>7}{'chunk':>6}"
+    for name in names:
+        header += f" | {name:>8} {'recv/s':>8} {'peakB':>6} {'kept':>5}"
+    print(header)
+
+    for label, payload in responses().items():
+        for size in opts.chunk_size:
+            expected = receive_stream(payload, size)
+            row = f"  {label[:24]:<24}{len(payload):>7}{size:>6}"
+            for name in names:
+                func = RECEIVERS[name]
+                call: Receiver = lambda data, f=func, s=size: f(data, s)
+                same = call(payload) == expected
+                if not same:
+                    mismatches += 1
+                seconds = timeit.timeit(lambda: call(payload), number=opts.iterations)
+                peak, kept = memory_profile(call, payload)
+                row += (
+                    f" | {'ok' if same else 'DIFF':>8}"
+                    f" {opts.iterations / seconds:8.0f} {peak:6d} {kept:5d}"
+                )
+            print(row)
+
+    if mismatches:
+        print(f"\n{mismatches} result(s) differ between receive paths")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Transport benchmark: FelicityClient against emulated batteries.
+
+Starts N emulated modules (in a separate thread with its own event loop, so
+their CPU time is not counted) and polls them all concurrently, the way one
+coordinator per battery would. Reports poll latency percentiles, TCP
+connections per poll and client CPU time per poll.
+
+    python benchmarks/bench_transport.py -b 8 -p 50 --latency 0.02 --chunk-size 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from _component import load
+from emulator import EmulatorConfig, FelicityEmulator
+
+api = load("api")
+
+
+class EmulatorThread:
+    """Runs emulators on a private event loop in a background thread."""
+
+    def __init__(self, configs: list[EmulatorConfig]) -> None:
+        self.emulators = [FelicityEmulator(cfg) for cfg in configs]
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> EmulatorThread:
+        self._thread.start()
+        self._call(self._start_all())
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._call(self._stop_all())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coro) -> None:
+        asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start_all(self) -> None:
+        for emulator in self.emulators:
+            await emulator.start()
+
+    async def _stop_all(self) -> None:
+        for emulator in self.emulators:
+            await emulator.stop()
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def run(opts: argparse.Namespace) -> None:
+    config = EmulatorConfig(
+        latency=opts.latency,
+        chunk_size=opts.chunk_size,
+        chunk_delay=opts.chunk_delay,
+        truncate_every=opts.truncate_every,
+        settings_objects=opts.settings_objects,
+    )
+    # --full: read all three sections on every poll (no tiered refresh)
+    extra = {"basic_interval": 0, "settings_interval": 0} if opts.full else {}
+
+    with EmulatorThread([config] * opts.batteries) as emulators:
+        clients = [
+            api.FelicityClient("127.0.0.1", emulator.port, **extra)
+            for emulator in emulators.emulators
+        ]
+        latencies: list[float] = []
+        failures = 0
+
+        async def poll(client) -> None:
+            nonlocal failures
+            start = time.perf_counter()
+            try:
+                await client.async_get_data()
+            except api.FelicityApiError:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        for _ in range(opts.polls):
+            await asyncio.gather(*(poll(client) for client in clients))
+            if opts.interval:
+                await asyncio.sleep(opts.interval)
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+
+        for client in clients:
+            await client.async_close()
+
+        polls = opts.polls * opts.batteries
+        connections = sum(e.stats.connections for e in emulators.emulators)
+        commands = sum(sum(e.stats.commands.values()) for e in emulators.emulators)
+
+    print(
+        f"{opts.batteries} batteries x {opts.polls} polls "
+        f"(latency {opts.latency * 1000:.0f} ms, chunk {opts.chunk_size or 'all'}, "
+        f"{'full' if opts.full else 'tiered'} refresh)"
+    )
+    print(f"  poll latency p50   {percentile(latencies, 50) * 1000:8.2f} ms")
+    print(f"  poll latency p99   {percentile(latencies, 99) * 1000:8.2f} ms")
+    print(f"  failed polls       {failures:8d}")
+    print(f"  connections/poll   {connections / polls:8.3f}")
+    print(f"  commands/poll      {commands / polls:8.3f}")
+    print(f"  client CPU/poll    {cpu / polls * 1e6:8.1f} us")
+    print(f"  wall time          {wall:8.2f} s")
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("-b", "--batteries", type=int, default=4)
+    args.add_argument("-p", "--polls", type=int, default=50)
+    args.add_argument(
+        "--interval", type=float, default=0.0, help="pause between polls, s"
+    )
+    args.add_argument("--latency", type=float, default=0.0)
+    args.add_argument("--chunk-size", type=int, default=0)
+    args.add_argument("--chunk-delay", type=float, default=0.0)
+    args.add_argument("--truncate-every", type=int, default=0)
+    args.add_argument("--settings-objects", type=int, default=3)
+    args.add_argument(
+        "--full", action="store_true", help="read all sections every poll"
+    )
+    asyncio.run(run(args.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Emulator of the Felicity Wi-Fi module's local TCP API.
+
+Speaks the ``wifilocalMonitor:get dev ...`` commands and replays recorded
+payloads, with configurable latency, chunking, truncation and the number
+of objects in the multi-object ``set infor`` reply.
+
+    python benchmarks/emulator.py [--port 53970] [--latency 0.05] ...
+
+Point the integration (or ``bench_transport.py``) at the printed address.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import re
+
+import payloads
+
+DEFAULT_PORT = 53970
+
+_COMMAND_RE = re.compile(rb"wifilocalMonitor:get dev (real|basice|set) infor")
+
+
+@dataclass
+class EmulatorConfig:
+    """Behaviour of an emulated module."""
+
+    # Delay between receiving a command and the first response byte, s
+    latency: float = 0.0
+    # Send responses in chunks of this many bytes (0 = all at once) ...
+    chunk_size: int = 0
+    # ... with this delay between chunks, s
+    chunk_delay: float = 0.0
+    # Every Nth response is cut in half and the connection dropped (0 = never)
+    truncate_every: int = 0
+    # Number of JSON objects the 'set infor' reply is split into (1..3)
+    settings_objects: int = len(payloads.SETTINGS)
+    real: str = payloads.REAL_JSON
+    basic: str = payloads.BASIC
+    settings: tuple[str, ...] = payloads.SETTINGS
+
+
+@dataclass
+class EmulatorStats:
+    """Counters of one emulator instance."""
+
+    connections: int = 0
+    commands: dict[str, int] = field(default_factory=dict)
+    bytes_sent: int = 0
+    truncated: int = 0
+
+
+class FelicityEmulator:
+    """asyncio TCP server pretending to be one battery's Wi-Fi module."""
+
+    def __init__(self, config: EmulatorConfig | None = None) -> None:
+        self.config = config or EmulatorConfig()
+        self.stats = EmulatorStats()
+        self._server: asyncio.AbstractServer | None = None
+        self._responses = 0
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _response(self, kind: str) -> bytes:
+        cfg = self.config
+        if kind == "real":
+            return cfg.real.encode()
+        if kind == "basice":
+            return cfg.basic.encode()
+        # Склеиваем объекты настроек в нужное количество частей
+        count = max(1, min(cfg.settings_objects, len(cfg.settings)))
+        parts = [dict_body(obj) for obj in cfg.settings]
+        groups = [parts[i::count] for i in range(count)]
+        return "".join("{" + ",".join(g) + "}" for g in groups).encode()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        cfg = self.config
+        self.stats.connections += 1
+        buffer = b""
+        try:
+            while True:
+                chunk = await reader.read(1024)
+                if not chunk:
+                    return
+                buffer += chunk
+                while (m := _COMMAND_RE.search(buffer)) is not None:
+                    buffer = buffer[m.end() :]
+                    kind = m.group(1).decode()
+                    self.stats.commands[kind] = self.stats.commands.get(kind, 0) + 1
+                    payload = self._response(kind)
+
+                    self._responses += 1
+                    truncate = (
+                        cfg.truncate_every
+                        and self._responses % cfg.truncate_every == 0
+                    )
+                    if truncate:
+                        payload = payload[: len(payload) // 2]
+
+                    if cfg.latency:
+                        await asyncio.sleep(cfg.latency)
+                    await self._send(writer, payload)
+
+                    if truncate:
+                        self.stats.truncated += 1
+                        return
+        except (ConnectionError, asyncio.CancelledError):
+            return
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, payload: bytes) -> None:
+        cfg = self.config
+        size = cfg.chunk_size or len(payload)
+        for start in range(0, len(payload), size):
+            if start and cfg.chunk_delay:
+                await asyncio.sleep(cfg.chunk_delay)
+            writer.write(payload[start : start + size])
+            await writer.drain()
+        self.stats.bytes_sent += len(payload)
+
+
+def dict_body(obj: str) -> str:
+    """Return the inside of a one-level ``{...}`` object literal."""
+    return obj.strip()[1:-1]
+
+
+def _parse_args() -> argparse.Namespace:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("--host", default="127.0.0.1")
+    args.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args.add_argument("--latency", type=float, default=0.0)
+    args.add_argument("--chunk-size", type=int, default=0)
+    args.add_argument("--chunk-delay", type=float, default=0.0)
+    args.add_argument("--truncate-every", type=int, default=0)
+    args.add_argument(
+        "--settings-objects", type=int, default=len(payloads.SETTINGS)
+    )
+    args.add_argument(
+        "--python-literals",
+        action="store_true",
+        help="reply to 'real infor' with single quotes and None",
+    )
+    return args.parse_args()
+
+
+async def _main() -> None:
+    opts = _parse_args()
+    emulator = FelicityEmulator(
+        EmulatorConfig(
+            latency=opts.latency,
+            chunk_size=opts.chunk_size,
+            chunk_delay=opts.chunk_delay,
+            truncate_every=opts.truncate_every,
+            settings_objects=opts.settings_objects,
+            real=(
+                payloads.REAL_SINGLE_QUOTES_NONE
+                if opts.python_literals
+                else payloads.REAL_JSON
+            ),
+        )
+    )
+    await emulator.start(opts.host, opts.port)
+    print(f"Felicity emulator listening on {opts.host}:{emulator.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await emulator.stop()
+        print(emulator.stats)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,43 @@
+"""Payload corpus used by the benchmarks and the emulator.
+
+``corpus/real`` holds 'dev real infor' replies, ``corpus/settings`` holds
+'dev set infor' replies, one payload per ``.txt`` file. Files named after a
+model (``fla48200_*``, ``commver2_*``, ...) follow the replies of those
+modules and firmwares (serial numbers replaced); ``synthetic_*`` files are
+constructed edge cases: truncated and concatenated frames, garbage around
+the frame, invalid objects.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+
+def corpus(kind: str) -> dict[str, str]:
+    """Return ``{name: payload}`` for ``kind`` ("real" or "settings")."""
+    return {
+        path.stem: path.read_text()
+        for path in sorted((CORPUS_DIR / kind).glob("*.txt"))
+    }
+
+
+def _read(kind: str, name: str) -> str:
+    return (CORPUS_DIR / kind / f"{name}.txt").read_text()
+
+
+REAL_JSON = _read("real", "fla48200_json")
+REAL_SINGLE_QUOTES_NONE = _read("real", "fla48200_single_quotes_none")
+
+BASIC = (
+    "{'CommVer':1,'wifiSN':'F0000000000001','version':'1.12',"
+    "'M1SwVer':'2.03','M2SwVer':'1.07','Type':80,'SubType':4}"
+)
+
+# 'dev set infor' replies with several JSON objects back to back
+SETTINGS = (
+    "{'CommVer':1,'ttlPack':1,'wCVP80':3400,'wCVP20':3200}",
+    "{'cVolHi':3650,'cVolLo':2800,'cVolHiR':3450,'cVolLoR':3000}",
+    "{'bCCHi2':1000,'bDCHi2':1500,'bTmpHi':550,'bTmpLo':0}",
+)
@@ -1,28 +1,90 @@
 from __future__ import annotations
 # -*- coding: utf-8 -*-
 
-from datetime import timedelta
 import logging
+import shutil
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.typing import ConfigType
-from homeassistant.helpers.update_coordinator import (
-    DataUpdateCoordinator,
-    UpdateFailed,
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
 )
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
 
-from .api import FelicityApiError, FelicityClient
+from .api import FelicityClient
 from .const import (
-    DEFAULT_SCAN_INTERVAL,
     DOMAIN,
+    FLEET_KEY,
     PLATFORMS,
 )
+from .coordinator import FelicityCoordinator, archive_directory, snapshot_store
+from .fleet import async_get_fleet
+from .history import HISTORY_COLUMNS, HISTORY_TIERS
+
 _LOGGER = logging.getLogger(__name__)
 
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+SERVICE_GET_HISTORY = "get_history"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_TIER = "tier"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_COLUMNS = "columns"
+
+GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_TIER, default="raw"): vol.In(list(HISTORY_TIERS)),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_COLUMNS): vol.All(
+            cv.ensure_list,
+            [vol.In([name for name, *_ in HISTORY_COLUMNS] + ["cells"])],
+        ),
+    }
+)
+
+
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
-    """Set up via YAML (not used)."""
+    """Set up via YAML (not used); register the integration services."""
+
+    async def async_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return in-memory history of one battery."""
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        data = hass.data.get(DOMAIN, {}).get(entry_id)
+        if data is None:
+            raise ServiceValidationError(
+                f"Felicity battery entry {entry_id} is not loaded"
+            )
+        coordinator: FelicityCoordinator = data["coordinator"]
+        # Время без зоны — в зоне HA, а не ОС
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        return coordinator.history.query(
+            call.data[ATTR_TIER],
+            start=dt_util.as_local(start).timestamp() if start else None,
+            end=dt_util.as_local(end).timestamp() if end else None,
+            columns=call.data.get(ATTR_COLUMNS),
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     return True
 
 
@@ -33,21 +95,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     port: int = entry.data["port"]
     client = FelicityClient(host, port)
 
-    async def _async_update_data():
-        try:
-            return await client.async_get_data()
-        except FelicityApiError as err:
-            raise UpdateFailed(str(err)) from err
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=f"{DOMAIN}_{host}",
-        update_method=_async_update_data,
-        update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
-    )
+    # Все батареи опрашиваются через общий планировщик
+    fleet = async_get_fleet(hass)
+    coordinator = FelicityCoordinator(hass, entry, client, fleet)
+    fleet.add(coordinator)
 
-    await coordinator.async_config_entry_first_refresh()
+    if await coordinator.async_restore():
+        # Сущности поднимаются из сохранённых данных, живой опрос — в фоне
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {host}"
+        )
+    else:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            await _async_leave_fleet(hass, entry.entry_id)
+            await client.async_close()
+            raise
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
@@ -55,6 +119,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         "coordinator": coordinator,
             }
 
+    async def _async_flush_archive(event: Event) -> None:
+        await coordinator.async_flush_archive()
+
+    # Несохранённые опросы дописываются в архив при остановке HA
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_flush_archive)
+    )
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
@@ -63,5 +135,29 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok and DOMAIN in hass.data:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if data is not None:
+            await data["coordinator"].async_flush_archive()
+            await data["client"].async_close()
+    if unload_ok:
+        await _async_leave_fleet(hass, entry.entry_id)
     return unload_ok
+
+
+async def _async_leave_fleet(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove an entry from the fleet; drop the fleet with the last one."""
+    fleet = hass.data.get(FLEET_KEY)
+    if fleet is None:
+        return
+    fleet.remove(entry_id)
+    if not fleet.members:
+        await fleet.async_shutdown()
+        hass.data.pop(FLEET_KEY, None)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the saved data and the telemetry archive of a removed entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(
+        shutil.rmtree, archive_directory(hass, entry.entry_id), True
+    )
@@ -1,147 +1,914 @@
 from __future__ import annotations
 
 import asyncio
+from functools import partial
 import json
 import logging
+import random
 import re
-from typing import Any, Dict
+import time
+from typing import Any, Callable, Dict
+
+from .metrics import PollMetrics, TransportMetrics
+from .parser import parse_real_payload, parse_settings_payload
 
 _LOGGER = logging.getLogger(__name__)
 
+# Модуль закрывает простаивающие сокеты сам; переподключаемся заранее
+CONNECTION_IDLE_TIMEOUT = 60  # seconds
+# Недоступный модуль не должен держать опрос до таймаута ОС
+CONNECT_TIMEOUT = 3.0  # seconds
+# Общий дедлайн на чтение одного ответа
+READ_TIMEOUT = 5.0  # seconds
+# Повторы запроса: не больше попыток и не начинать новую позже дедлайна
+REQUEST_ATTEMPTS = 3
+REQUEST_DEADLINE = 10.0  # seconds
+RETRY_BACKOFF = 0.25  # seconds, doubled per attempt, ±50 % jitter
+# Circuit breaker: после N неудачных запросов подряд не ходим к модулю
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_OPEN_TIME = 30.0  # seconds, doubled after each failed probe ...
+BREAKER_MAX_OPEN_TIME = 300.0  # seconds, ... up to this
+# Пока число JSON-объектов в ответе на команду неизвестно, ждём ещё столько
+# после закрытия очередного объекта (один раз на команду)
+FRAME_GRACE_TIMEOUT = 0.3  # seconds
+# Версии/тип и пороги меняются крайне редко, не опрашиваем их каждый цикл
+BASIC_REFRESH_INTERVAL = 24 * 60 * 60  # seconds
+SETTINGS_REFRESH_INTERVAL = 60 * 60  # seconds
+# Кэш секций отдаётся, пока не старше TTL, даже если перечитать не удаётся
+SECTION_TTL = 7 * 24 * 60 * 60  # seconds
+# Пауза перед повтором неудачного чтения секции
+SECTION_RETRY_INTERVAL = 2 * 60  # seconds
+
+CMD_REAL = b"wifilocalMonitor:get dev real infor"
+CMD_BASIC = b"wifilocalMonitor:get dev basice infor"
+CMD_SETTINGS = b"wifilocalMonitor:get dev set infor"
+
+# Number of top-level JSON objects each command is known to reply with.
+# 'set infor' varies between firmwares and is learned on first read.
+_KNOWN_FRAME_COUNTS: dict[bytes, int] = {
+    CMD_REAL: 1,
+    CMD_BASIC: 1,
+}
+
+# Короткие имена команд для метрик/диагностики
+_COMMAND_NAMES: dict[bytes, str] = {
+    CMD_REAL: "real",
+    CMD_BASIC: "basic",
+    CMD_SETTINGS: "settings",
+}
+
+# Приёмный буфер соединения; ответы модуля — единицы килобайт
+RECV_BUFFER_SIZE = 8192
+RECV_MIN_FREE = 1024
+
+_OPEN_BRACE = 0x7B  # {
+_CLOSE_BRACE = 0x7D  # }
+_BACKSLASH = 0x5C  # backslash
+_QUOTES = (0x22, 0x27)  # " and '
+_STRUCTURAL_RE = re.compile(rb"""[{}"'\\]""")
+
 
 class FelicityApiError(Exception):
     """Error while communicating with Felicity battery."""
 
 
-class FelicityClient:
-    """TCP client for Felicity battery local API."""
-
-    def __init__(self, host: str, port: int) -> None:
+class FelicityCircuitOpenError(FelicityApiError):
+    """Request refused without contacting the module (circuit open)."""
+
+
+# Состояния circuit breaker (значения сенсора)
+BREAKER_STATES = ("closed", "open", "half_open")
+
+
+class _FrameScanner:
+    """Incremental scanner for top-level JSON objects in a byte stream.
+
+    Keeps brace depth and string state (the module uses both single and
+    double quotes) between chunks, so a frame split anywhere across reads
+    is still recognised. Bytes outside of objects are ignored. Only the
+    structural bytes (braces, quotes, backslashes) are visited.
+    """
+
+    __slots__ = ("objects", "start", "end", "_depth", "_quote", "_skip", "_pos")
+
+    def __init__(self) -> None:
+        self.objects = 0  # completed top-level objects
+        self.start = -1  # offset of the first object's opening brace
+        self.end = 0  # offset just past the last completed object
+        self._depth = 0
+        self._quote = 0
+        self._skip = -1  # offset of a byte escaped by a backslash
+        self._pos = 0
+
+    def feed(self, chunk: bytes | memoryview) -> None:
+        """Scan the next chunk of the stream."""
+        depth = self._depth
+        quote = self._quote
+        skip = self._skip
+        pos = self._pos
+
+        for match in _STRUCTURAL_RE.finditer(chunk):
+            i = match.start()
+            if pos + i == skip:
+                continue
+            ch = chunk[i]
+            if quote:
+                if ch == _BACKSLASH:
+                    skip = pos + i + 1
+                elif ch == quote:
+                    quote = 0
+            elif ch == _OPEN_BRACE:
+                if not depth and self.start < 0:
+                    self.start = pos + i
+                depth += 1
+            elif ch == _CLOSE_BRACE:
+                if depth > 0:
+                    depth -= 1
+                    if depth == 0:
+                        self.objects += 1
+                        self.end = pos + i + 1
+            elif depth and ch in _QUOTES:
+                quote = ch
+
+        self._depth = depth
+        self._quote = quote
+        self._skip = skip
+        self._pos = pos + len(chunk)
+
+    @property
+    def in_frame(self) -> bool:
+        """Return True while inside an unfinished top-level object."""
+        return self._depth > 0
+
+
+class _ReceiveProtocol(asyncio.BufferedProtocol):
+    """Connection protocol receiving responses into one reusable buffer.
+
+    The transport reads straight into a preallocated ``bytearray`` (grown
+    only if a response does not fit), and only the newly arrived bytes are
+    fed to the frame scanner, as a ``memoryview``. A response is decoded
+    once, from a slice of the buffer, without intermediate ``bytes``.
+    """
+
+    def __init__(self, size: int = RECV_BUFFER_SIZE) -> None:
+        self.transport: asyncio.Transport | None = None
+        self.scanner = _FrameScanner()
+        self.closed = False  # EOF received or connection lost
+        self.length = 0  # bytes of the current response in the buffer
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._waiter: asyncio.Future[None] | None = None
+        self._lost: asyncio.Future[None] | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._lost = asyncio.get_running_loop().create_future()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if len(self._buffer) - self.length < RECV_MIN_FREE:
+            # Редкий случай: ответ не влез, удваиваем буфер
+            buffer = bytearray(len(self._buffer) * 2)
+            buffer[: self.length] = self._view[: self.length]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        return self._view[self.length :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        start = self.length
+        self.length += nbytes
+        self.scanner.feed(self._view[start : self.length])
+        self._wake()
+
+    def eof_received(self) -> bool:
+        self.closed = True
+        self._wake()
+        return False
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.closed = True
+        self._wake()
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(None)
+
+    async def async_wait_closed(self) -> None:
+        """Wait until the transport has closed the socket."""
+        if self._lost is not None:
+            await asyncio.shield(self._lost)
+
+    def reset(self) -> None:
+        """Forget the previous response before sending a command."""
+        self.length = 0
+        self.scanner = _FrameScanner()
+
+    async def async_wait(self, timeout: float) -> None:
+        """Wait until more bytes arrive or the connection closes."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiter = waiter
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._waiter = None
+
+    def text(self, start: int, end: int) -> str:
+        """Decode ``buffer[start:end]`` (ASCII, undecodable bytes dropped)."""
+        return str(self._view[start:end], "ascii", "ignore")
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
+class _CircuitBreaker:
+    """Stops sending requests to a module that keeps failing.
+
+    ``closed``: requests pass; BREAKER_FAILURE_THRESHOLD failed requests in
+    a row open the circuit. ``open``: requests are refused at once until the
+    cool-down has passed. ``half_open``: one probe request is let through;
+    success closes the circuit, failure opens it again for twice as long.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = BREAKER_STATES
+
+    def __init__(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0  # consecutive failed requests
+        self.open_time = BREAKER_OPEN_TIME
+        self.opened_at = 0.0  # time.monotonic()
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 if not open)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_time - time.monotonic())
+
+    def allow(self) -> bool:
+        """Return True if a new request may be sent now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and not self.retry_in:
+            # Этот запрос и есть пробный
+            self.state = self.HALF_OPEN
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self.open_time = BREAKER_OPEN_TIME
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.open_time = min(self.open_time * 2, BREAKER_MAX_OPEN_TIME)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self._open()
+
+    def record_cancelled(self) -> None:
+        """A request ended without a verdict; a probe may be sent again."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.opens += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.opens,
+            "rejected_requests": self.rejected,
+            "open_time": self.open_time,
+            "retry_in": round(self.retry_in, 1),
+        }
+
+
+class _HostSession:
+    """Serialized access to one Felicity module (host:port).
+
+    The module reliably serves only one client at a time, so every command
+    to a host goes through one FIFO queue over one persistent connection,
+    shared by all clients of that host. Identical commands that are already
+    queued or in flight are collapsed into a single request (single-flight).
+
+    Failed requests are retried a bounded number of times with jittered
+    backoff, and a circuit breaker makes requests fail fast while the
+    module keeps failing.
+    """
+
+    _sessions: dict[tuple[str, int], _HostSession] = {}
+
+    def __init__(self, host: str, port: int, idle_timeout: float) -> None:
         self._host = host
         self._port = port
-
-    async def async_get_data(self) -> dict:
-        """Send commands and combine all data into one dict.
-
-        - wifilocalMonitor:get dev real infor   -> runtime telemetry
-        - wifilocalMonitor:get dev basice infor -> versions / type
-        - wifilocalMonitor:get dev set infor    -> config / limits (multi-json)
+        self._idle_timeout = idle_timeout
+        self._users = 0
+
+        # Persistent connection, reused across commands and polls
+        self._transport: asyncio.Transport | None = None
+        self._protocol: _ReceiveProtocol | None = None
+        self._last_used = 0.0
+        self._lock = asyncio.Lock()
+        self._frame_counts: dict[bytes, int] = dict(_KNOWN_FRAME_COUNTS)
+
+        # Single-flight: command -> running request
+        self._inflight: dict[bytes, asyncio.Task[str]] = {}
+
+        self._connects = 0
+        self._reuses = 0
+        self._reconnects = 0
+
+        self._queued = 0
+        self._max_queued = 0
+        self._requests = 0
+        self._collapsed = 0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+        self._total_wait = 0.0
+
+        self.metrics = TransportMetrics()
+        self.breaker = _CircuitBreaker()
+
+    @classmethod
+    def acquire(cls, host: str, port: int, idle_timeout: float) -> _HostSession:
+        """Return the session for host:port, creating it if needed."""
+        session = cls._sessions.get((host, port))
+        if session is None:
+            session = cls._sessions[(host, port)] = cls(host, port, idle_timeout)
+        session._users += 1
+        return session
+
+    async def async_release(self) -> None:
+        """Drop one user; close the connection when none are left."""
+        self._users -= 1
+        if self._users > 0:
+            return
+        if self._sessions.get((self._host, self._port)) is self:
+            del self._sessions[(self._host, self._port)]
+        async with self._lock:
+            await self._async_disconnect()
+
+    @property
+    def connection_stats(self) -> dict[str, int]:
+        """Return connection counters (handshakes vs reused sockets)."""
+        return {
+            "connects": self._connects,
+            "reuses": self._reuses,
+            "reconnects": self._reconnects,
+        }
+
+    @property
+    def scheduler_stats(self) -> dict[str, Any]:
+        """Return queue depth and wait time statistics."""
+        requests = self._requests
+        return {
+            "queue_depth": self._queued,
+            "max_queue_depth": self._max_queued,
+            "requests": requests,
+            "collapsed": self._collapsed,
+            "last_wait": round(self._last_wait, 4),
+            "max_wait": round(self._max_wait, 4),
+            "avg_wait": round(self._total_wait / requests, 4) if requests else 0.0,
+        }
+
+    async def async_request(self, command: bytes) -> str:
+        """Send command and return the response frames as text.
+
+        If the same command is already queued or in flight, wait for that
+        request instead of sending it again. Raises FelicityCircuitOpenError
+        without contacting the module while the circuit is open.
         """
-        # 1. Runtime data
-        real_raw = await self._async_read_raw(b"wifilocalMonitor:get dev real infor")
-        real = self._parse_real_payload(real_raw)
-        data: Dict[str, Any] = dict(real)
-
-        # 2. Basic info
-        try:
-            basic_raw = await self._async_read_raw(
-                b"wifilocalMonitor:get dev basice infor"
-            )
-            basic_text = basic_raw.replace("'", '"').strip()
-            basic = json.loads(basic_text)
-            data["_basic"] = basic
-        except Exception as err:
-            _LOGGER.debug("Failed to read basic info: %s", err)
-
-        
-        # 3. Settings / limits (может быть в нескольких JSON-блоках)
+        task = self._inflight.get(command)
+        if task is None:
+            if not self.breaker.allow():
+                raise FelicityCircuitOpenError(
+                    f"{self._host}:{self._port} keeps failing, next attempt in "
+                    f"{self.breaker.retry_in:.0f} s"
+                )
+            task = asyncio.ensure_future(self._async_queued_request(command))
+            self._inflight[command] = task
+            task.add_done_callback(partial(self._request_done, command))
+        else:
+            self._collapsed += 1
+        # shield: a cancelled caller must not cancel a request others share
+        return await asyncio.shield(task)
+
+    def _request_done(self, command: bytes, task: asyncio.Task[str]) -> None:
+        if self._inflight.get(command) is task:
+            del self._inflight[command]
+        if not task.cancelled():
+            # Mark as retrieved even if every waiter has gone away
+            task.exception()
+
+    async def _async_queued_request(self, command: bytes) -> str:
+        loop = asyncio.get_running_loop()
+        enqueued = loop.time()
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
         try:
-            set_raw = await self._async_read_raw(
-                b"wifilocalMonitor:get dev set infor"
-            )
-            set_text = set_raw.replace("'", '"').strip()
-            merged: Dict[str, Any] = {}
+            async with self._lock:
+                wait = loop.time() - enqueued
+                self._requests += 1
+                self._last_wait = wait
+                self._max_wait = max(self._max_wait, wait)
+                self._total_wait += wait
+                try:
+                    data = await self._async_request_locked(command)
+                except FelicityApiError:
+                    self.breaker.record_failure()
+                    raise
+                except asyncio.CancelledError:
+                    self.breaker.record_cancelled()
+                    raise
+                self.breaker.record_success()
+                return data
+        finally:
+            self._queued -= 1
 
-            # Разбираем несколько JSON-объектов подряд:
-            depth = 0
-            start = None
-            json_objects: list[str] = []
+    async def _async_request_locked(self, command: bytes) -> str:
+        """Run one command on the persistent connection (lock held).
 
-            for i, ch in enumerate(set_text):
-                if ch == "{":
-                    if depth == 0:
-                        start = i
-                    depth += 1
-                elif ch == "}":
-                    if depth > 0:
-                        depth -= 1
-                        if depth == 0 and start is not None:
-                            json_objects.append(set_text[start : i + 1])
-                            start = None
-
-            # На всякий случай fallback на простое регулярное выражение
-            if not json_objects:
-                json_objects = re.findall(r"\{.*?\}", set_text)
-
-            for obj in json_objects:
-                try:
-                    part = json.loads(obj)
-                    merged.update(part)
-                except Exception as e:
-                    _LOGGER.debug("Skip invalid part in settings: %s", e)
-                    continue
-
-            if merged:
-                data["_settings"] = merged
+        Up to REQUEST_ATTEMPTS attempts, none started after REQUEST_DEADLINE.
+        A reused socket may have been dropped by the module without us
+        noticing; that is retried at once on a new connection, other
+        failures after a jittered, exponentially growing pause.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            reused = False
+            try:
+                reused = await self._async_ensure_connection()
+                data = await self._async_exchange(command)
+            except FelicityApiError as err:
+                await self._async_disconnect()
+                delay = 0.0 if reused else self._retry_delay(attempt)
+                elapsed = time.monotonic() - started
+                if attempt >= REQUEST_ATTEMPTS or elapsed + delay >= REQUEST_DEADLINE:
+                    self.metrics.failures += 1
+                    raise
+                if reused:
+                    self._reconnects += 1
                 _LOGGER.debug(
-                    "Merged Felicity settings (%d keys): %s",
-                    len(merged),
-                    merged,
+                    "Request %r to %s:%s failed (%s), retry %d in %.2f s",
+                    command,
+                    self._host,
+                    self._port,
+                    err,
+                    attempt,
+                    delay,
                 )
-            else:
-                _LOGGER.debug("No valid JSON found in settings payload: %r", set_text)
-
-        except Exception as err:
-            _LOGGER.debug("Failed to read settings info: %s", err)
-
-        return data
-
-    async def _async_read_raw(self, command: bytes) -> str:
-        """Open TCP, send command, read response as text."""
+                self.metrics.retries += 1
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+            self._last_used = time.monotonic()
+            return data
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        return RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+    async def _async_ensure_connection(self) -> bool:
+        """Make sure a usable connection exists; return True if reused."""
+        transport = self._transport
+        if transport is not None and self._protocol is not None:
+            idle = time.monotonic() - self._last_used
+            if (
+                not transport.is_closing()
+                and not self._protocol.closed
+                and idle < self._idle_timeout
+            ):
+                self._reuses += 1
+                return True
+            await self._async_disconnect()
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
         try:
-            reader, writer = await asyncio.open_connection(self._host, self._port)
+            self._transport, self._protocol = await asyncio.wait_for(
+                loop.create_connection(_ReceiveProtocol, self._host, self._port),
+                CONNECT_TIMEOUT,
+            )
+        except asyncio.TimeoutError as err:
+            raise FelicityApiError(
+                f"Timed out connecting to {self._host}:{self._port}"
+            ) from err
         except Exception as err:
             raise FelicityApiError(
                 f"Error connecting to {self._host}:{self._port}: {err}"
             ) from err
 
+        self.metrics.phases["connect"].add(time.perf_counter() - started)
+        self._connects += 1
+        self._last_used = time.monotonic()
+        _LOGGER.debug(
+            "Connected to %s:%s (%s)", self._host, self._port, self.connection_stats
+        )
+        return False
+
+    async def _async_disconnect(self) -> None:
+        """Drop the current connection."""
+        transport = self._transport
+        protocol = self._protocol
+        self._transport = None
+        self._protocol = None
+        if transport is None or protocol is None:
+            return
+        transport.close()
+        await protocol.async_wait_closed()
+
+    async def _async_exchange(self, command: bytes) -> str:
+        """Write one command and read its response from the open connection.
+
+        Returns the text from the first frame's opening brace to the end of
+        the last complete frame (or to the end of the data if no frame was
+        completed). A reply that lost objects after the first one (closed
+        or timed out early) raises FelicityApiError.
+        """
+        transport = self._transport
+        protocol = self._protocol
+        assert transport is not None and protocol is not None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + READ_TIMEOUT
+        expected = self._frame_counts.get(command)
+        phases = self.metrics.phases
+        started = time.perf_counter()
+        first_byte = 0.0
+
+        protocol.reset()
+        scanner = protocol.scanner
+        settled = False
         try:
-            writer.write(command)
-            await writer.drain()
+            # Команда — десятки байт, буфер записи не переполняется
+            transport.write(command)
+            sent = time.perf_counter()
+            phases["send"].add(sent - started)
 
-            data = b""
-            for _ in range(20):
-                try:
-                    chunk = await asyncio.wait_for(reader.read(1024), timeout=0.5)
-                except asyncio.TimeoutError:
+            while expected is None or scanner.objects < expected:
+                if protocol.closed:
                     break
-                if not chunk:
+                timeout = deadline - loop.time()
+                grace = (
+                    expected is None
+                    and scanner.objects
+                    and not scanner.in_frame
+                    and FRAME_GRACE_TIMEOUT < timeout
+                )
+                if grace:
+                    timeout = FRAME_GRACE_TIMEOUT
+                if timeout <= 0:
                     break
-                data += chunk
-                if b"}" in chunk:
-                    try:
-                        more = await asyncio.wait_for(reader.read(1024), timeout=0.2)
-                        if more:
-                            data += more
-                    except asyncio.TimeoutError:
-                        pass
+                try:
+                    await protocol.async_wait(timeout)
+                except asyncio.TimeoutError:
+                    # Ответ считается полным, только если затих между кадрами
+                    settled = bool(grace)
                     break
+                if not first_byte and protocol.length:
+                    first_byte = time.perf_counter()
+                    phases["wait"].add(first_byte - sent)
 
         except Exception as err:
             raise FelicityApiError(
                 f"Error talking to {self._host}:{self._port}: {err}"
             ) from err
-        finally:
-            writer.close()
-            try:
-                await writer.wait_closed()
-            except Exception:
-                pass
 
-        if not data:
+        length = protocol.length
+        if not length:
             raise FelicityApiError("No data received from battery")
 
-        text = data.decode("ascii", errors="ignore").strip()
+        phases["read"].add(time.perf_counter() - first_byte)
+        self.metrics.add_bytes(_COMMAND_NAMES.get(command, "other"), length)
+
+        start = max(scanner.start, 0)
+        # Число объектов запоминаем, только если ответ затих между кадрами,
+        # а не оборвался (закрытие соединения, общий таймаут)
+        settled = settled and not protocol.closed
+        if expected is None and settled:
+            self._frame_counts[command] = scanner.objects
+            _LOGGER.debug(
+                "Response to %r has %d JSON object(s)", command, scanner.objects
+            )
+        complete = settled or (expected is not None and scanner.objects >= expected)
+        if scanner.objects and not complete:
+            # Часть объектов потеряна: такой ответ неполон, число узнаём заново
+            if command not in _KNOWN_FRAME_COUNTS:
+                self._frame_counts.pop(command, None)
+            await self._async_disconnect()
+            raise FelicityApiError(
+                f"Response to {_COMMAND_NAMES.get(command, command)!r} ended "
+                f"after {scanner.objects} JSON object(s)"
+            )
+        if scanner.objects:
+            data = protocol.text(start, scanner.end)
+        else:
+            _LOGGER.debug("Incomplete response to %r (%d bytes)", command, length)
+            data = protocol.text(start, length)
+
+        if scanner.in_frame or not scanner.objects:
+            # Хвост ответа может прийти позже и попасть в следующий ответ
+            await self._async_disconnect()
+
+        return data
+
+
+class FelicityClient:
+    """TCP client for Felicity battery local API."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        idle_timeout: float = CONNECTION_IDLE_TIMEOUT,
+        basic_interval: float = BASIC_REFRESH_INTERVAL,
+        settings_interval: float = SETTINGS_REFRESH_INTERVAL,
+        section_ttl: float = SECTION_TTL,
+    ) -> None:
+        self._host = host
+        self._port = port
+
+        # Slow-changing sections: (data key, command, refresh interval, parser)
+        self._sections = (
+            ("_basic", CMD_BASIC, basic_interval, self._parse_basic_payload),
+            (
+                "_settings",
+                CMD_SETTINGS,
+                settings_interval,
+                self._parse_settings_payload,
+            ),
+        )
+        self._section_data: dict[str, Dict[str, Any]] = {}
+        self._section_fetched_at: dict[str, float] = {}
+        # Stale-while-revalidate state
+        self._section_ttl = section_ttl
+        self._section_failed_at: dict[str, float] = {}
+        self._revalidations: dict[str, asyncio.Task[None]] = {}
+
+        # Fingerprints of raw replies: command -> (fingerprint, parsed dict)
+        self._parsed: dict[bytes, tuple[int, Dict[str, Any]]] = {}
+        self._section_fingerprint: dict[str, int] = {}
+        self._fingerprint_hits: dict[str, int] = {}
+        self._fingerprint_misses: dict[str, int] = {}
+
+        self._session = _HostSession.acquire(host, port, idle_timeout)
+        self._closed = False
+
+        self.poll_metrics = PollMetrics()
+        self._poll_bytes = 0
+        self._poll_parse = 0.0
+
+    @property
+    def connection_stats(self) -> dict[str, int]:
+        """Return connection counters (handshakes vs reused sockets)."""
+        return self._session.connection_stats
+
+    @property
+    def scheduler_stats(self) -> dict[str, Any]:
+        """Return request queue statistics of the host session."""
+        return self._session.scheduler_stats
+
+    @property
+    def transport_metrics(self) -> TransportMetrics:
+        """Return per-phase timings of the host session."""
+        return self._session.metrics
+
+    @property
+    def breaker_state(self) -> str:
+        """Return the circuit breaker state: closed, open or half_open."""
+        return self._session.breaker.state
+
+    @property
+    def breaker_stats(self) -> dict[str, Any]:
+        """Return circuit breaker state and counters."""
+        return self._session.breaker.as_dict()
+
+    @property
+    def fingerprint_stats(self) -> dict[str, dict[str, Any]]:
+        """Return how often a reply was identical to the previous one."""
+        stats: dict[str, dict[str, Any]] = {}
+        for name in self._fingerprint_hits.keys() | self._fingerprint_misses.keys():
+            hits = self._fingerprint_hits.get(name, 0)
+            total = hits + self._fingerprint_misses.get(name, 0)
+            stats[name] = {
+                "hits": hits,
+                "misses": total - hits,
+                "hit_rate": round(hits / total, 3) if total else None,
+            }
+        return stats
+
+    def restore_sections(self, data: Dict[str, Any], age: float) -> None:
+        """Seed the slow-section cache from data polled ``age`` seconds ago.
+
+        Each section counts from when it was itself read (``age`` plus its
+        ``_section_age`` at that poll), so it is re-read when its refresh
+        interval has passed, not on the first poll and not never.
+        """
+        now = time.monotonic()
+        section_age = data.get("_section_age")
+        if not isinstance(section_age, dict):
+            section_age = {}
+        for key, _command, interval, _parse in self._sections:
+            cached = data.get(key)
+            if isinstance(cached, dict) and key not in self._section_data:
+                read_age = section_age.get(key)
+                if not isinstance(read_age, (int, float)):
+                    # Возраст неизвестен: отдаём кэш, но перечитываем сразу
+                    read_age = interval
+                self._section_data[key] = cached
+                self._section_fetched_at[key] = now - age - read_age
+
+    async def async_close(self) -> None:
+        """Release the host session; the last user closes the connection."""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._revalidations.values():
+            task.cancel()
+        self._revalidations.clear()
+        await self._session.async_release()
+
+    async def async_get_data(self) -> dict:
+        """Send commands and combine all data into one dict.
+
+        - wifilocalMonitor:get dev real infor   -> runtime telemetry
+        - wifilocalMonitor:get dev basice infor -> versions / type
+        - wifilocalMonitor:get dev set infor    -> config / limits (multi-json)
+
+        Runtime data is read on every call. Basic info and settings almost
+        never change, so the cached copies are merged in (stale while
+        revalidate): a section is read inline only while there is no copy
+        yet, later it is re-read in the background once its refresh interval
+        has passed. A failed read is retried after SECTION_RETRY_INTERVAL and
+        marks the section stale; a copy older than the TTL is dropped.
+
+        ``_section_age`` maps each merged section to its age in seconds,
+        ``_stale`` lists the sections whose last re-read failed.
+
+        A reply identical to the previous reply to the same command is not
+        parsed again; the earlier result is reused. ``_fingerprint``
+        identifies the content of the whole result (runtime reply, merged
+        sections and stale markers, not the ages), so equal fingerprints
+        mean nothing visible has changed since the last call.
+
+        Duration, bytes received and parse time of every call are recorded
+        in ``poll_metrics``.
+        """
+        metrics = self.poll_metrics
+        self._poll_bytes = 0
+        self._poll_parse = 0.0
+        started = time.perf_counter()
+        try:
+            data = await self._async_poll()
+        except FelicityApiError:
+            metrics.record(False)
+            raise
+        metrics.record(True)
+        metrics.latency.add(time.perf_counter() - started)
+        metrics.bytes.add(self._poll_bytes)
+        metrics.parse.add(self._poll_parse)
+        return data
+
+    async def _async_poll(self) -> Dict[str, Any]:
+        # 1. Runtime data
+        real_raw = await self._async_read_raw(CMD_REAL)
+        real_fp, real = self._parse_cached(
+            CMD_REAL, self._parse_real_payload, real_raw
+        )
+        data: Dict[str, Any] = dict(real)
+        fingerprint: list[Any] = [real_fp]
+
+        # 2. Basic info, 3. Settings / limits
+        ages: dict[str, int] = {}
+        stale: list[str] = []
+        for key, command, interval, parse in self._sections:
+            now = time.monotonic()
+            if self._section_due(key, interval, now):
+                if key in self._section_data:
+                    self._start_revalidation(key, command, parse)
+                else:
+                    await self._async_refresh_section(key, command, parse)
+                    now = time.monotonic()
+
+            cached = self._section_data.get(key)
+            if cached is None:
+                continue
+            age = now - self._section_fetched_at[key]
+            if age >= self._section_ttl:
+                _LOGGER.debug("Cached %s expired (%.0f s old)", key, age)
+                del self._section_data[key]
+                continue
+            data[key] = cached
+            ages[key] = round(age)
+            if key in self._section_failed_at:
+                stale.append(key)
+            fingerprint.append((key, self._section_fingerprint.get(key)))
+
+        data["_section_age"] = ages
+        data["_stale"] = stale
+        data["_fingerprint"] = hash((*fingerprint, *stale))
+        return data
+
+    def _section_due(self, key: str, interval: float, now: float) -> bool:
+        """Return True if section ``key`` should be (re-)read now."""
+        if key in self._revalidations:
+            return False
+        failed_at = self._section_failed_at.get(key)
+        if failed_at is not None and now - failed_at < SECTION_RETRY_INTERVAL:
+            return False
+        fetched_at = self._section_fetched_at.get(key)
+        return fetched_at is None or now - fetched_at >= interval
+
+    def _start_revalidation(
+        self, key: str, command: bytes, parse: Callable[[str], Dict[str, Any]]
+    ) -> None:
+        task = asyncio.ensure_future(
+            self._async_refresh_section(key, command, parse)
+        )
+        self._revalidations[key] = task
+        task.add_done_callback(lambda _task: self._revalidations.pop(key, None))
+
+    async def _async_refresh_section(
+        self, key: str, command: bytes, parse: Callable[[str], Dict[str, Any]]
+    ) -> None:
+        """Read one section into the cache; failures keep the old copy."""
+        try:
+            raw = await self._async_read_raw(command)
+            fingerprint, parsed = self._parse_cached(command, parse, raw)
+        except Exception as err:
+            # Пока отдаём кэш; повторим через SECTION_RETRY_INTERVAL
+            self._section_failed_at[key] = time.monotonic()
+            _LOGGER.debug("Failed to read %s: %s", key, err)
+            return
+        self._section_data[key] = parsed
+        self._section_fingerprint[key] = fingerprint
+        self._section_fetched_at[key] = time.monotonic()
+        self._section_failed_at.pop(key, None)
+
+    def _parse_cached(
+        self, command: bytes, parse: Callable[[str], Dict[str, Any]], text: str
+    ) -> tuple[int, Dict[str, Any]]:
+        """Parse ``text`` unless it equals the previous reply to ``command``.
+
+        Returns (fingerprint, parsed dict); the dict is shared with earlier
+        calls when the reply did not change, so it must not be modified.
+        """
+        # hash() строки дешевле разбора и кэшируется; нужен только в процессе
+        fingerprint = hash(text)
+        name = _COMMAND_NAMES.get(command, "other")
+        cached = self._parsed.get(command)
+        if cached is not None and cached[0] == fingerprint:
+            self._fingerprint_hits[name] = self._fingerprint_hits.get(name, 0) + 1
+            return cached
+        self._fingerprint_misses[name] = self._fingerprint_misses.get(name, 0) + 1
+        parsed = self._timed_parse(parse, text)
+        self._parsed[command] = (fingerprint, parsed)
+        return fingerprint, parsed
+
+    def _timed_parse(
+        self, parse: Callable[[str], Dict[str, Any]], text: str
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return parse(text)
+        finally:
+            self._poll_parse += time.perf_counter() - started
+
+    def _parse_basic_payload(self, text: str) -> Dict[str, Any]:
+        """Parse Felicity 'dev basice infor' payload."""
+        basic_text = text.replace("'", '"').strip()
+        return json.loads(basic_text)
+
+    def _parse_settings_payload(self, text: str) -> Dict[str, Any]:
+        """Parse Felicity 'dev set infor' payload (several JSON blocks)."""
+        merged = parse_settings_payload(text)
+        if not merged:
+            raise FelicityApiError(
+                f"No valid JSON found in settings payload: {text!r}"
+            )
+
+        _LOGGER.debug(
+            "Merged Felicity settings (%d keys): %s",
+            len(merged),
+            merged,
+        )
+        return merged
+
+    async def _async_read_raw(self, command: bytes) -> str:
+        """Send command through the host session, read response as text."""
+        text = await self._session.async_request(command)
+        self._poll_bytes += len(text)
+        text = text.strip()
         _LOGGER.debug("Raw Felicity response for %r: %r", command, text)
         return text
 
@@ -151,115 +918,12 @@ class FelicityClient:
 
     def _parse_real_payload(self, text: str) -> Dict[str, Any]:
         """Parse Felicity 'dev real infor' payload into dict we use."""
-        norm = text.replace("'", '"')
-        last_brace = norm.rfind("}")
-        if last_brace != -1:
-            norm = norm[: last_brace + 1]
-
-        result: Dict[str, Any] = {}
-
-        def _find_str(key: str) -> str | None:
-            m = re.search(rf'"{key}"\s*:\s*"([^"]*)"', norm)
-            return m.group(1) if m else None
-
-        def _find_int(key: str) -> int | None:
-            m = re.search(rf'"{key}"\s*:\s*([-0-9]+)', norm)
-            return int(m.group(1)) if m else None
-
-        # Simple fields
-        result["CommVer"] = _find_int("CommVer")
-        result["wifiSN"] = _find_str("wifiSN")
-        result["DevSN"] = _find_str("DevSN")
-        result["Estate"] = _find_int("Estate")
-        result["Bfault"] = _find_int("Bfault")
-        result["Bwarn"] = _find_int("Bwarn") or 0
-
-        # Batt: [[53300],[1],[null]]
-        m = re.search(
-            r'"Batt"\s*:\s*\[\s*\[\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*\]\s*,\s*\[\s*(null|None|[-0-9]+)?\s*\]\s*\]',
-            norm,
-        )
-        if m:
-            v = int(m.group(1))
-            i = int(m.group(2))
-            third_raw = m.group(3)
-            third = None
-            if third_raw not in (None, "null", "None", ""):
-                third = int(third_raw)
-            result["Batt"] = [[v], [i], [third]]
-
-        # Batsoc: [[9900,1000,250000]]
-        m = re.search(
-            r'"Batsoc"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
-            norm,
-        )
-        if m:
-            soc = int(m.group(1))
-            scale = int(m.group(2))
-            cap = int(m.group(3))
-            result["Batsoc"] = [[soc, scale, cap]]
-
-        # BMaxMin: [[3345,3338],[6,7]]
-        m = re.search(
-            r'"BMaxMin"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
-            norm,
-        )
-        if m:
-            max_v = int(m.group(1))
-            min_v = int(m.group(2))
-            max_i = int(m.group(3))
-            min_i = int(m.group(4))
-            result["BMaxMin"] = [[max_v, min_v], [max_i, min_i]]
-
-        # LVolCur: [[576,480],[100,1500]]
-        m = re.search(
-            r'"LVolCur"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
-            norm,
-        )
-        if m:
-            v1 = int(m.group(1))
-            v2 = int(m.group(2))
-            c1 = int(m.group(3))
-            c2 = int(m.group(4))
-            result["LVolCur"] = [[v1, v2], [c1, c2]]
-
-        # BTemp
-        btemp = None
-        m = re.search(
-            r'"BTemp"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]'
-            r'(?:\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\])?\s*\]',
-            norm,
-        )
-        if m:
-            t1 = int(m.group(1))
-            t2 = int(m.group(2))
-            if m.group(3) is not None and m.group(4) is not None:
-                t3 = int(m.group(3))
-                t4 = int(m.group(4))
-                btemp = [[t1, t2], [t3, t4]]
-            else:
-                btemp = [[t1, t2]]
-        else:
-            m = re.search(
-                r'"Templist"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]',
-                norm,
-            )
-            if m:
-                t1 = int(m.group(1))
-                t2 = int(m.group(2))
-                btemp = [[t1, t2]]
-        if btemp is not None:
-            result["BTemp"] = btemp
-
-        # BatcelList
-        m = re.search(r'"BatcelList"\s*:\s*\[\s*\[([0-9,\s-]+)\]', norm)
-        if m:
-            cells_str = m.group(1)
-            try:
-                cells = [int(x) for x in cells_str.split(",") if x.strip() != ""]
-                result["BatcelList"] = [cells]
-            except Exception:
-                _LOGGER.debug("Failed to parse BatcelList from %r", cells_str)
+        try:
+            result = parse_real_payload(text)
+        except Exception as err:
+            raise FelicityApiError(
+                f"Unable to parse payload: {err}: {text!r}"
+            ) from err
 
         _LOGGER.debug("Parsed Felicity real data dict: %s", result)
 
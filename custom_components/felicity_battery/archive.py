@@ -0,0 +1,242 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+from typing import Any, Iterator
+
+from .history import HISTORY_COLUMNS, sample_values
+from .snapshot import CELL_EMPTY
+
+# Дневные сегменты: <каталог>/YYYY-MM-DD.fba (дата по UTC)
+ARCHIVE_SUFFIX = ".fba"
+ARCHIVE_FLUSH_INTERVAL = 5 * 60  # seconds between appends to disk
+ARCHIVE_RETENTION_DAYS = 400
+
+# Заголовок блока: маркер, число строк, число ячеек (little-endian)
+_BLOCK_HEADER = struct.Struct("<BHB")
+_BLOCK_MARKER = 0xFC
+_MAX_BLOCK_ROWS = 0xFFFF
+_MAX_CELLS = 0xFF
+
+# Колонки блока по порядку: время, HISTORY_COLUMNS, затем ячейки ("H")
+_TIME_CODE = "I"  # unix time, s
+_COLUMN_NAMES = tuple(name for name, *_ in HISTORY_COLUMNS)
+_COLUMN_CODES = (_TIME_CODE, *(code for _, code, _, _ in HISTORY_COLUMNS))
+
+# Файлы всегда little-endian; на big-endian машинах байты переставляются
+_SWAP = sys.byteorder != "little"
+
+
+def _column_bytes(code: str, values: Any) -> bytes:
+    column = array(code, values)
+    if _SWAP:
+        column.byteswap()
+    return column.tobytes()
+
+
+def encode_block(rows: list[tuple[int, list[int]]]) -> bytes:
+    """Encode (unix time, sample values) rows as one archive block.
+
+    All rows must have the same number of cells. The block is the header
+    followed by one fixed-width column after another (time, the
+    HISTORY_COLUMNS values, then each cell), so a reader can view every
+    column in place with ``memoryview.cast``. Blocks are self-contained:
+    appending never reads the file.
+    """
+    width = len(rows[0][1]) - len(HISTORY_COLUMNS)
+    parts = [_BLOCK_HEADER.pack(_BLOCK_MARKER, len(rows), width)]
+    parts.append(_column_bytes(_TIME_CODE, (timestamp for timestamp, _ in rows)))
+    for index, code in enumerate(_COLUMN_CODES[1:]):
+        parts.append(_column_bytes(code, (values[index] for _, values in rows)))
+    for index in range(len(HISTORY_COLUMNS), len(HISTORY_COLUMNS) + width):
+        parts.append(_column_bytes("H", (values[index] for _, values in rows)))
+    return b"".join(parts)
+
+
+def _blocks(rows: list[tuple[int, list[int]]]) -> Iterator[bytes]:
+    """Split rows into blocks of equal cell count and bounded size."""
+    run: list[tuple[int, list[int]]] = []
+    for timestamp, values in rows:
+        values = values[: len(HISTORY_COLUMNS) + _MAX_CELLS]
+        if run and (
+            len(values) != len(run[0][1]) or len(run) == _MAX_BLOCK_ROWS
+        ):
+            yield encode_block(run)
+            run = []
+        run.append((timestamp, values))
+    if run:
+        yield encode_block(run)
+
+
+class TelemetryArchive:
+    """Daily segment files with every poll of one battery.
+
+    Polls are collected in memory (``add``) and appended every
+    ARCHIVE_FLUSH_INTERVAL as blocks of fixed-width columns (``write``,
+    blocking: run it in the executor). Segments older than
+    ARCHIVE_RETENTION_DAYS are deleted when a new one is started.
+    ``blocks`` maps a segment and yields its columns as memoryviews into
+    the file, without copying; ``read`` copies a time range into
+    ``array`` columns. Neither creates a Python object per value.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+        self.pending: list[tuple[int, list[int]]] = []
+        self.bytes_written = 0
+        self.rows_written = 0
+
+    def add(self, timestamp: float, data: dict[str, Any]) -> None:
+        values, _ = sample_values(data)
+        self.pending.append((int(timestamp), values))
+
+    def take(self) -> list[tuple[int, list[int]]]:
+        rows, self.pending = self.pending, []
+        return rows
+
+    def segment_path(self, day: date) -> Path:
+        return self.directory / f"{day.isoformat()}{ARCHIVE_SUFFIX}"
+
+    def write(self, rows: list[tuple[int, list[int]]]) -> None:
+        """Append rows to their daily segments (blocking)."""
+        by_day: dict[date, list[tuple[int, list[int]]]] = {}
+        for row in rows:
+            by_day.setdefault(_utc_day(row[0]), []).append(row)
+        if not by_day:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for day, day_rows in by_day.items():
+            path = self.segment_path(day)
+            new = not path.exists()
+            data = b"".join(_blocks(day_rows))
+            with path.open("ab") as file:
+                file.write(data)
+            self.bytes_written += len(data)
+            self.rows_written += len(day_rows)
+            if new:
+                self._prune(day)
+
+    def _prune(self, today: date) -> None:
+        oldest = today - timedelta(days=ARCHIVE_RETENTION_DAYS)
+        for day, path in self.segments():
+            if day < oldest:
+                path.unlink(missing_ok=True)
+
+    def segments(self) -> Iterator[tuple[date, Path]]:
+        """Yield (day, path) of the segment files, oldest first."""
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.glob(f"*{ARCHIVE_SUFFIX}")):
+            try:
+                yield date.fromisoformat(path.stem), path
+            except ValueError:
+                continue
+
+    def blocks(self, path: Path) -> Iterator[list[memoryview]]:
+        """Yield the columns of each block of a segment, in place.
+
+        Each item is [time, *HISTORY_COLUMNS, *cells] as memoryviews cast
+        to the column type, pointing into the memory-mapped file; they are
+        valid only until the generator resumes. Little-endian hosts only.
+        """
+        with path.open("rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                view = memoryview(buf)
+                try:
+                    yield from _iter_blocks(view)
+                finally:
+                    view.release()
+
+    def read(
+        self, start: float | None = None, end: float | None = None
+    ) -> dict[str, Any]:
+        """Return the archived polls between two unix times (blocking).
+
+        ``time`` is an ``array('I')``, each HISTORY_COLUMNS name an array
+        of its raw type and ``cells`` a list with one ``array('H')`` per
+        cell; missing values are the column sentinels (see history).
+        """
+        first_day = _utc_day(start) if start is not None else date.min
+        last_day = _utc_day(end) if end is not None else date.max
+        times = array(_TIME_CODE)
+        columns = [array(code) for code in _COLUMN_CODES[1:]]
+        cells: list[array] = []
+        for day, path in self.segments():
+            if first_day <= day <= last_day:
+                self._read_segment(path, start, end, times, columns, cells)
+        if _SWAP:
+            for column in (times, *columns, *cells):
+                column.byteswap()
+        result: dict[str, Any] = {"time": times}
+        result.update(zip(_COLUMN_NAMES, columns))
+        result["cells"] = cells
+        return result
+
+    def _read_segment(
+        self,
+        path: Path,
+        start: float | None,
+        end: float | None,
+        times: array,
+        columns: list[array],
+        cells: list[array],
+    ) -> None:
+        for block in self.blocks(path):
+            block_times = block[0]
+            if _SWAP:
+                # Время нужно для поиска диапазона — здесь без memoryview
+                block_times = array(_TIME_CODE, block_times.tobytes())
+                block_times.byteswap()
+            first = 0 if start is None else bisect_left(block_times, start)
+            last = len(block_times) if end is None else bisect_right(block_times, end)
+            if first >= last:
+                continue
+            row = len(times)
+            for target, column in zip((times, *columns), block):
+                target.frombytes(column[first:last].cast("B"))
+            width = len(block) - len(_COLUMN_CODES)
+            while len(cells) < width:
+                cells.append(array("H", [CELL_EMPTY]) * row)
+            for i, target in enumerate(cells):
+                if i < width:
+                    column = block[len(_COLUMN_CODES) + i]
+                    target.frombytes(column[first:last].cast("B"))
+                else:
+                    target.extend(array("H", [CELL_EMPTY]) * (last - first))
+
+
+def _iter_blocks(view: memoryview) -> Iterator[list[memoryview]]:
+    size = len(view)
+    pos = 0
+    while pos + _BLOCK_HEADER.size <= size:
+        marker, rows, width = _BLOCK_HEADER.unpack_from(view, pos)
+        if marker != _BLOCK_MARKER:
+            break  # не наш формат или мусор
+        pos += _BLOCK_HEADER.size
+        codes = (*_COLUMN_CODES, *("H" * width))
+        length = sum(array(code).itemsize for code in codes) * rows
+        if pos + length > size:
+            break  # блок дописан не до конца (сбой при записи)
+        block: list[memoryview] = []
+        for code in codes:
+            end = pos + array(code).itemsize * rows
+            block.append(view[pos:end].cast(code))
+            pos = end
+        try:
+            yield block
+        finally:
+            for column in block:
+                column.release()
+
+
+def _utc_day(timestamp: float) -> date:
+    return datetime.fromtimestamp(timestamp, timezone.utc).date()
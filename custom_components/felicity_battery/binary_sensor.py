@@ -2,6 +2,7 @@ from __future__ import annotations
 # -*- coding: utf-8 -*-
 
 from dataclasses import dataclass
+from operator import attrgetter
 from typing import Any
 
 from homeassistant.components.binary_sensor import (
@@ -10,22 +11,40 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntityDescription,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
+from .entity import AttrsFn, FelicityEntity, ValueFn
+from .snapshot import FelicitySnapshot
 
 # Порог "большого" разброса по ячейкам, В
 CELL_DRIFT_HIGH_THRESHOLD_V = 0.03
 
 
-@dataclass
+@dataclass(kw_only=True)
 class FelicityBinarySensorDescription(BinarySensorEntityDescription):
     """Extended description for Felicity binary sensors."""
 
+    value_fn: ValueFn
+    attrs_fn: AttrsFn | None = None
+
+
+def _cell_drift_high(snap: FelicitySnapshot) -> bool | None:
+    if snap.cell_drift is None:
+        return None
+    return snap.cell_drift > CELL_DRIFT_HIGH_THRESHOLD_V
+
+
+def _cell_drift_high_attrs(snap: FelicitySnapshot) -> dict[str, Any] | None:
+    if snap.cell_drift is None:
+        return None
+    return {
+        "drift_v": snap.cell_drift,
+        "threshold_v": CELL_DRIFT_HIGH_THRESHOLD_V,
+    }
+
 
 BINARY_SENSOR_DESCRIPTIONS: tuple[FelicityBinarySensorDescription, ...] = (
     FelicityBinarySensorDescription(
@@ -33,34 +52,41 @@ BINARY_SENSOR_DESCRIPTIONS: tuple[FelicityBinarySensorDescription, ...] = (
         name="Battery Fault Active",
         device_class=BinarySensorDeviceClass.PROBLEM,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("fault_active"),
     ),
     FelicityBinarySensorDescription(
         key="warning_active",
         name="Battery Warning Active",
         device_class=BinarySensorDeviceClass.PROBLEM,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("warning_active"),
     ),
     FelicityBinarySensorDescription(
         key="charging",
         name="Battery Charging",
         device_class=BinarySensorDeviceClass.POWER,
+        value_fn=attrgetter("charging"),
     ),
     FelicityBinarySensorDescription(
         key="discharging",
         name="Battery Discharging",
         device_class=BinarySensorDeviceClass.POWER,
+        value_fn=attrgetter("discharging"),
     ),
     FelicityBinarySensorDescription(
         key="standby",
         name="Battery Standby",
         device_class=BinarySensorDeviceClass.POWER,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("standby"),
     ),
     FelicityBinarySensorDescription(
         key="cell_drift_high",
         name="Cell Voltage Drift High",
         device_class=BinarySensorDeviceClass.PROBLEM,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=_cell_drift_high,
+        attrs_fn=_cell_drift_high_attrs,
     ),
 )
 
@@ -81,126 +107,12 @@ async def async_setup_entry(
     async_add_entities(entities)
 
 
-class FelicityBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class FelicityBinarySensor(FelicityEntity, BinarySensorEntity):
     """Representation of a Felicity binary sensor."""
 
-    _attr_has_entity_name = True
-
-    def __init__(
-        self,
-        coordinator,
-        entry: ConfigEntry,
-        description: FelicityBinarySensorDescription,
-    ) -> None:
-        super().__init__(coordinator)
-        self.entity_description = description
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
-
-    @property
-    def device_info(self) -> dict[str, Any]:
-        data = self.coordinator.data or {}
-        serial = data.get("DevSN") or data.get("wifiSN") or self._entry.entry_id
-        basic = data.get("_basic") or {}
-        sw_version = basic.get("version")
-        host = self._entry.data.get(CONF_HOST)
-        serial_display = f"{serial} ({host})" if host else serial
-
-
-        return {
-            "identifiers": {(DOMAIN, serial)},
-            "name": self._entry.data.get("name", "Felicity Battery"),
-            "manufacturer": "Felicity",
-            "model": "FLA48200",
-            "sw_version": sw_version,
-            "serial_number": serial_display,
-        }
-
+    entity_description: FelicityBinarySensorDescription
 
     @property
     def is_on(self) -> bool | None:
         """Return true if the binary sensor is on."""
-        data: dict = self.coordinator.data or {}
-        key = self.entity_description.key
-
-        def get_nested(path: tuple[Any, ...]):
-            cur: Any = data
-            try:
-                for p in path:
-                    cur = cur[p]
-                return cur
-            except (KeyError, IndexError, TypeError):
-                return None
-
-        if key == "fault_active":
-            v = data.get("Bfault")
-            if v is None:
-                return None
-            return v != 0
-
-        if key == "warning_active":
-            v = data.get("Bwarn")
-            if v is None:
-                return None
-            return v != 0
-
-        estate = data.get("Estate")
-        if key == "charging":
-            # по коду состояния + по знаку тока
-            if estate == 9152:
-                return True
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is None:
-                return None
-            return (i_raw / 10.0) > 0.05
-
-        if key == "discharging":
-            if estate == 5056:
-                return True
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is None:
-                return None
-            return (i_raw / 10.0) < -0.05
-
-        if key == "standby":
-            if estate in (960, 320):
-                return True
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is None:
-                return None
-            return abs(i_raw / 10.0) <= 0.05
-
-        if key == "cell_drift_high":
-            max_raw = get_nested(("BMaxMin", 0, 0))
-            min_raw = get_nested(("BMaxMin", 0, 1))
-            if max_raw is None or min_raw is None:
-                return None
-            drift_v = (max_raw - min_raw) / 1000.0
-            return drift_v > CELL_DRIFT_HIGH_THRESHOLD_V
-
-        return None
-
-    @property
-    def extra_state_attributes(self) -> dict[str, Any] | None:
-        """Attributes for some binary sensors."""
-        data: dict = self.coordinator.data or {}
-        key = self.entity_description.key
-
-        if key == "cell_drift_high":
-            attrs: dict[str, Any] = {}
-            bmaxmin = data.get("BMaxMin")
-            if (
-                isinstance(bmaxmin, list)
-                and bmaxmin
-                and isinstance(bmaxmin[0], list)
-                and len(bmaxmin[0]) >= 2
-            ):
-                max_raw = bmaxmin[0][0]
-                min_raw = bmaxmin[0][1]
-                if isinstance(max_raw, int) and isinstance(min_raw, int):
-                    drift_v = (max_raw - min_raw) / 1000.0
-                    attrs["drift_v"] = round(drift_v, 3)
-                    attrs["threshold_v"] = CELL_DRIFT_HIGH_THRESHOLD_V
-            return attrs or None
-
-        return None
\ No newline at end of file
+        return self._current_value()
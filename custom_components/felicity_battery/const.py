@@ -8,6 +8,31 @@ DOMAIN = "felicity_battery"
 DEFAULT_PORT = 53970
 DEFAULT_SCAN_INTERVAL = 30  # seconds
 
+# Адаптивный опрос: быстро под нагрузкой / у границ SOC, медленно в простое
+FAST_SCAN_INTERVAL = 5  # seconds
+IDLE_SCAN_INTERVAL = 120  # seconds
+ACTIVE_CURRENT_A = 1.0
+SOC_LOW_LIMIT = 10.0  # %
+SOC_HIGH_LIMIT = 98.0  # %
+
+# Экспоненциальная пауза после повторных ошибок (с джиттером ±20 %)
+MAX_BACKOFF_INTERVAL = 300  # seconds
+BACKOFF_JITTER = 0.2
+
+# Изменения внутри deadband не пишутся, но не реже этого интервала
+DEADBAND_MAX_AGE = 10 * 60  # seconds
+
+# Последний удачный опрос сохраняется и отдаётся сразу при старте HA
+STORAGE_VERSION = 1
+STORE_SAVE_DELAY = 120  # seconds, coalesces writes between polls
+RESTORE_MAX_AGE = 24 * 60 * 60  # seconds, older data is not restored
+
+# Общий планировщик опроса всех батарей (fleet)
+FLEET_KEY = f"{DOMAIN}_fleet"  # hass.data key
+FLEET_MAX_CONCURRENT_POLLS = 2
+# Ёмкость, если пакет не сообщил свою (Batsoc), А·ч
+BATTERY_CAPACITY_AH = 200
+
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
     Platform.BINARY_SENSOR,
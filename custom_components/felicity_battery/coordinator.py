@@ -0,0 +1,301 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import timedelta
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .api import FelicityApiError, FelicityClient
+from .archive import ARCHIVE_FLUSH_INTERVAL, TelemetryArchive
+from .const import (
+    ACTIVE_CURRENT_A,
+    BACKOFF_JITTER,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    FAST_SCAN_INTERVAL,
+    IDLE_SCAN_INTERVAL,
+    MAX_BACKOFF_INTERVAL,
+    RESTORE_MAX_AGE,
+    SOC_HIGH_LIMIT,
+    SOC_LOW_LIMIT,
+    STORAGE_VERSION,
+    STORE_SAVE_DELAY,
+)
+from .energy import EnergyAccumulator
+from .history import TelemetryHistory
+from .snapshot import FelicitySnapshot
+
+if TYPE_CHECKING:
+    from .fleet import FelicityFleet
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store holding the last good data of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+def archive_directory(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the directory of a config entry's telemetry archive."""
+    return hass.config.path(DOMAIN, entry_id)
+
+
+class FelicityCoordinator(DataUpdateCoordinator[FelicitySnapshot]):
+    """Polls one battery and decodes each response into a snapshot.
+
+    The poll interval follows the battery state: fast while current flows
+    or SOC is close to a limit, slow when the pack is idle, and exponential
+    backoff (with jitter) while requests keep failing.
+
+    Time spent notifying entities is recorded in the client's poll metrics.
+
+    The last good raw data is persisted (debounced) and can be restored at
+    startup, so entities have values before the battery has answered.
+
+    With a fleet, every poll waits for its paced slot in the shared
+    scheduler (see :class:`FelicityFleet`).
+
+    Charge/discharge energy is integrated from the power of every
+    successful poll (see :class:`EnergyAccumulator`) and stored on the
+    snapshot. Every successful poll is also kept in ``history``
+    (:class:`TelemetryHistory`), read by the ``get_history`` service,
+    and appended to the on-disk ``archive`` every ARCHIVE_FLUSH_INTERVAL.
+
+    When a poll returns exactly what the previous one did (same client
+    fingerprint), the previous snapshot is kept and, unless energy is
+    still flowing, entities are not notified at all; ``skipped_updates``
+    counts those polls.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        client: FelicityClient,
+        fleet: FelicityFleet | None = None,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{entry.data['host']}",
+            update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+        )
+        self.entry = entry
+        self.client = client
+        self.fleet = fleet
+        self._failures = 0
+        self._store = snapshot_store(hass, entry.entry_id)
+        self._unchanged = False
+        self._notified_success = False
+        self.skipped_updates = 0
+        # Слушатели каждого опроса, включая неудачные и пропущенные
+        self._poll_listeners: list[CALLBACK_TYPE] = []
+        self.energy = EnergyAccumulator()
+        self.history = TelemetryHistory()
+        self.archive = TelemetryArchive(archive_directory(hass, entry.entry_id))
+        self._archive_flushed = time.monotonic()
+        self._archive_task: asyncio.Task[None] | None = None
+
+    async def async_restore(self) -> bool:
+        """Load the persisted snapshot as current data.
+
+        Returns False if there is nothing usable (missing, malformed or
+        older than RESTORE_MAX_AGE); the caller then has to refresh.
+        """
+        try:
+            stored = await self._store.async_load()
+        except Exception as err:  # повреждённый файл не должен мешать старту
+            _LOGGER.warning("%s: cannot load saved data: %s", self.name, err)
+            return False
+        if not isinstance(stored, dict):
+            return False
+        data = stored.get("data")
+        updated_at = stored.get("updated_at")
+        if not isinstance(data, dict) or not isinstance(updated_at, (int, float)):
+            return False
+
+        snapshot = FelicitySnapshot(data, updated_at=updated_at, restored=True)
+        if snapshot.age > RESTORE_MAX_AGE:
+            return False
+        self.client.restore_sections(data, snapshot.age)
+        self.data = snapshot
+        _LOGGER.debug(
+            "%s: restored data saved %.0f s ago", self.name, snapshot.age
+        )
+        return True
+
+    @callback
+    def async_add_poll_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call ``update_callback`` after every poll, failed ones included.
+
+        Regular listeners are not called on repeated failures or unchanged
+        replies; the poll metrics change on every poll regardless.
+        """
+        self._poll_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._poll_listeners.remove(update_callback)
+
+        return remove_listener
+
+    async def _async_update_data(self) -> FelicitySnapshot:
+        try:
+            return await self._async_poll()
+        finally:
+            for update_callback in list(self._poll_listeners):
+                update_callback()
+
+    async def _async_poll(self) -> FelicitySnapshot:
+        self._unchanged = False
+        try:
+            if self.fleet is not None:
+                interval = (
+                    self.update_interval.total_seconds()
+                    if self.update_interval is not None
+                    else None
+                )
+                async with self.fleet.async_slot(interval):
+                    data = await self.client.async_get_data()
+            else:
+                data = await self.client.async_get_data()
+        except FelicityApiError as err:
+            self._failures += 1
+            self._set_interval(self._backoff_interval())
+            raise UpdateFailed(str(err)) from err
+
+        self._failures = 0
+        sampled_at = time.monotonic()
+        now = time.time()
+        self.history.add(now, data)
+        self.archive.add(now, data)
+        if sampled_at - self._archive_flushed >= ARCHIVE_FLUSH_INTERVAL:
+            self._flush_archive()
+        previous = self.data
+        if (
+            previous is not None
+            and not previous.restored
+            and previous.raw.get("_fingerprint") == data["_fingerprint"]
+        ):
+            # Ничего не изменилось: старый снимок, только время подтверждения
+            previous.updated_at = time.time()
+            # Возраст секций — от этого опроса, иначе после перезапуска
+            # они выглядели бы свежее, чем есть
+            previous.section_age = previous.raw["_section_age"] = data.get(
+                "_section_age"
+            ) or {}
+            flowing = self.energy.add_sample(sampled_at, previous.power)
+            self._fill_energy(previous)
+            self._unchanged = not flowing
+            # После серии ошибок интервал ещё backoff — вернуть обычный
+            self._set_interval(self._interval_for(previous))
+            self._store.async_delay_save(self._data_to_store, STORE_SAVE_DELAY)
+            return previous
+
+        snapshot = FelicitySnapshot(data)
+        self.energy.add_sample(sampled_at, snapshot.power)
+        self._fill_energy(snapshot)
+        self._set_interval(self._interval_for(snapshot))
+        self._store.async_delay_save(self._data_to_store, STORE_SAVE_DELAY)
+        return snapshot
+
+    def _fill_energy(self, snapshot: FelicitySnapshot) -> None:
+        snapshot.charge_energy = round(self.energy.charge, 3)
+        snapshot.discharge_energy = round(self.energy.discharge, 3)
+
+    @callback
+    def restore_energy(self, charge: float | None, discharge: float | None) -> None:
+        """Continue the energy totals from values saved before a restart."""
+        self.energy.restore(charge, discharge)
+        if self.data is not None:
+            self._fill_energy(self.data)
+
+    @callback
+    def _flush_archive(self) -> None:
+        """Append the collected polls to the archive in the background."""
+        if self._archive_task is not None and not self._archive_task.done():
+            return  # предыдущая запись ещё идёт, строки подождут
+        rows = self.archive.take()
+        self._archive_flushed = time.monotonic()
+        if rows:
+            self._archive_task = self.hass.async_create_background_task(
+                self._async_write_archive(rows), f"{self.name} archive write"
+            )
+
+    async def _async_write_archive(self, rows: list[tuple[int, list[int]]]) -> None:
+        try:
+            await self.hass.async_add_executor_job(self.archive.write, rows)
+        except OSError as err:
+            _LOGGER.warning("%s: cannot write telemetry archive: %s", self.name, err)
+
+    async def async_flush_archive(self) -> None:
+        """Write all collected polls now (unload, shutdown)."""
+        if self._archive_task is not None:
+            await self._archive_task
+        rows = self.archive.take()
+        if rows:
+            await self._async_write_archive(rows)
+
+    @callback
+    def _data_to_store(self) -> dict[str, Any]:
+        snap = self.data
+        return {"updated_at": snap.updated_at, "data": snap.raw}
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all entities and record how long that took.
+
+        Skipped if the poll brought nothing new and the entities already
+        know the coordinator is healthy; a value held back by a sensor's
+        deadband is written by that sensor's own timer.
+        """
+        if self._unchanged and self.last_update_success and self._notified_success:
+            self._unchanged = False
+            self.skipped_updates += 1
+            return
+        self._unchanged = False
+        self._notified_success = self.last_update_success
+        started = time.perf_counter()
+        super().async_update_listeners()
+        self.client.poll_metrics.fanout.add(time.perf_counter() - started)
+
+    @staticmethod
+    def _interval_for(snapshot: FelicitySnapshot) -> float:
+        """Pick the poll interval for the state the battery is in."""
+        current = snapshot.current
+        if current is not None and abs(current) >= ACTIVE_CURRENT_A:
+            return FAST_SCAN_INTERVAL
+        if snapshot.standby:
+            return IDLE_SCAN_INTERVAL
+        soc = snapshot.soc
+        if soc is not None and (soc <= SOC_LOW_LIMIT or soc >= SOC_HIGH_LIMIT):
+            return FAST_SCAN_INTERVAL
+        return DEFAULT_SCAN_INTERVAL
+
+    def _backoff_interval(self) -> float:
+        """Return the retry interval after ``self._failures`` failures."""
+        delay = min(
+            MAX_BACKOFF_INTERVAL,
+            DEFAULT_SCAN_INTERVAL * 2 ** (self._failures - 1),
+        )
+        return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+    def _set_interval(self, seconds: float) -> None:
+        interval = timedelta(seconds=seconds)
+        if interval != self.update_interval:
+            _LOGGER.debug(
+                "%s: poll interval %s -> %s", self.name, self.update_interval, interval
+            )
+            self.update_interval = interval
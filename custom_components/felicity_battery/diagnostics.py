@@ -0,0 +1,74 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import async_get_platforms
+
+from .const import DOMAIN
+from .coordinator import FelicityCoordinator
+from .entity import FelicityEntity
+
+TO_REDACT = {CONF_HOST, "DevSN", "wifiSN"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return poll-cycle metrics and the last decoded data of an entry."""
+    coordinator: FelicityCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+    client = coordinator.client
+    snap = coordinator.data
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "update_interval": (
+            coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None
+        ),
+        "last_update_success": coordinator.last_update_success,
+        "data_restored": snap.restored if snap else None,
+        "data_age": round(snap.age) if snap else None,
+        "poll": client.poll_metrics.as_dict(),
+        "transport": client.transport_metrics.as_dict(),
+        "connection": client.connection_stats,
+        "scheduler": client.scheduler_stats,
+        "circuit_breaker": client.breaker_stats,
+        "fingerprints": {
+            **client.fingerprint_stats,
+            "skipped_updates": coordinator.skipped_updates,
+        },
+        "energy": {
+            "charge_kwh": round(coordinator.energy.charge, 3),
+            "discharge_kwh": round(coordinator.energy.discharge, 3),
+            "skipped_gaps": coordinator.energy.skipped_gaps,
+        },
+        "history": coordinator.history.stats,
+        "archive": {
+            "pending_rows": len(coordinator.archive.pending),
+            "rows_written": coordinator.archive.rows_written,
+            "bytes_written": coordinator.archive.bytes_written,
+        },
+        "suppressed_writes": _suppressed_writes(hass, entry),
+        "data": async_redact_data(snap.raw, TO_REDACT) if snap else None,
+    }
+
+
+def _suppressed_writes(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Coordinator updates that did not need a state write, per entity."""
+    per_entity = {
+        entity.entity_id: entity.suppressed_writes
+        for platform in async_get_platforms(hass, DOMAIN)
+        if platform.config_entry is not None
+        and platform.config_entry.entry_id == entry.entry_id
+        for entity in platform.entities.values()
+        if isinstance(entity, FelicityEntity)
+    }
+    return {"total": sum(per_entity.values()), "entities": per_entity}
@@ -0,0 +1,73 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+# Интервал между отсчётами длиннее этого не интегрируем: что было с
+# мощностью во время пропуска (ошибки, перезапуск), неизвестно
+ENERGY_MAX_GAP = 3 * 60  # seconds
+
+
+class EnergyAccumulator:
+    """Charge and discharge energy integrated from power samples.
+
+    Samples are (time.monotonic(), W, + charge / - discharge). Each interval
+    between two samples is integrated with the trapezoidal rule; when the
+    power changes sign inside it, the interval is split at the
+    interpolated zero crossing, so charge and discharge are never netted
+    against each other. Intervals longer than ENERGY_MAX_GAP are skipped.
+    Totals are in kWh and only ever grow.
+    """
+
+    __slots__ = ("charge", "discharge", "skipped_gaps", "_last", "_restored")
+
+    def __init__(self) -> None:
+        self.charge = 0.0  # kWh
+        self.discharge = 0.0  # kWh
+        self.skipped_gaps = 0
+        self._last: tuple[float, float] | None = None
+        self._restored: set[str] = set()
+
+    def add_sample(self, timestamp: float, power: float | None) -> bool:
+        """Integrate up to a new sample; return True if a total grew."""
+        if power is None:
+            return False
+        last = self._last
+        self._last = (timestamp, power)
+        if last is None:
+            return False
+        last_time, last_power = last
+        dt = timestamp - last_time
+        if dt <= 0:
+            return False
+        if dt > ENERGY_MAX_GAP:
+            self.skipped_gaps += 1
+            return False
+
+        if (last_power >= 0) == (power >= 0) or last_power == 0 or power == 0:
+            charge_ws = _trapezoid(max(last_power, 0), max(power, 0), dt)
+            discharge_ws = _trapezoid(max(-last_power, 0), max(-power, 0), dt)
+        else:
+            # Смена знака: делим интервал в точке пересечения нуля
+            t_zero = dt * abs(last_power) / (abs(last_power) + abs(power))
+            first = abs(last_power) * t_zero / 2
+            second = abs(power) * (dt - t_zero) / 2
+            if last_power > 0:
+                charge_ws, discharge_ws = first, second
+            else:
+                charge_ws, discharge_ws = second, first
+
+        self.charge += charge_ws / 3_600_000
+        self.discharge += discharge_ws / 3_600_000
+        return charge_ws > 0 or discharge_ws > 0
+
+    def restore(self, charge: float | None, discharge: float | None) -> None:
+        """Add totals saved before a restart (kWh), once per total."""
+        if charge is not None and "charge" not in self._restored:
+            self._restored.add("charge")
+            self.charge += charge
+        if discharge is not None and "discharge" not in self._restored:
+            self._restored.add("discharge")
+            self.discharge += discharge
+
+
+def _trapezoid(p1: float, p2: float, dt: float) -> float:
+    return (p1 + p2) / 2 * dt
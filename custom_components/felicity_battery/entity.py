@@ -0,0 +1,127 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from collections.abc import Callable
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .coordinator import FelicityCoordinator
+from .snapshot import FelicitySnapshot
+
+# Возраст данных, пока показываем сохранённый снимок (до первого опроса)
+ATTR_DATA_AGE = "data_age"
+# Значение из кэша секции, которую не удалось перечитать
+ATTR_STALE = "stale"
+
+# Extractors used by the description tables of all platforms
+ValueFn = Callable[[FelicitySnapshot], Any]
+AttrsFn = Callable[[FelicitySnapshot], "dict[str, Any] | None"]
+
+
+class FelicityEntity(CoordinatorEntity[FelicityCoordinator]):
+    """Base entity reading one field of the coordinator snapshot.
+
+    The description's ``value_fn``/``attrs_fn`` are resolved once here, so
+    an update is a single call per entity. A coordinator update only writes
+    state when availability, value or attributes differ from what was last
+    written; skipped writes are counted in ``suppressed_writes``.
+    """
+
+    _attr_has_entity_name = True
+
+    # (available, value, attributes) as last written to the state machine
+    _last_written: tuple[Any, Any, Any] | None = None
+    _last_write_at = 0.0  # time.monotonic()
+    _suppressed_writes = 0
+
+    def __init__(
+        self,
+        coordinator: FelicityCoordinator,
+        entry: ConfigEntry,
+        description: EntityDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._entry = entry
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._value_fn: ValueFn = description.value_fn
+        self._attrs_fn: AttrsFn | None = description.attrs_fn
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        """Return device info to group entities into one device."""
+        snap = self.coordinator.data
+        serial = (snap.serial if snap else None) or self._entry.entry_id
+        sw_version = snap.fw_version if snap else None
+        # Прошивки BMS — в реестр устройств, а не в атрибуты сенсоров
+        bms = [fw for fw in (snap.bms_m1_fw, snap.bms_m2_fw) if fw] if snap else []
+        hw_version = "BMS " + " / ".join(str(fw) for fw in bms) if bms else None
+        host = self._entry.data.get(CONF_HOST)
+        serial_display = f"{serial} ({host})" if host else serial
+
+        return {
+            "identifiers": {(DOMAIN, serial)},
+            "name": self._entry.data.get("name", "Felicity Battery"),
+            "manufacturer": "Felicity",
+            "model": "FLA48200",
+            "sw_version": sw_version,
+            "hw_version": hw_version,
+            "serial_number": serial_display,
+        }
+
+    @property
+    def suppressed_writes(self) -> int:
+        """Return how many coordinator updates did not need a state write."""
+        return self._suppressed_writes
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the state that is written right after adding."""
+        await super().async_added_to_hass()
+        self._last_written = self._state_key()
+        self._last_write_at = time.monotonic()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if something visible changed."""
+        state = self._state_key()
+        if self._skip_write(state):
+            self._suppressed_writes += 1
+            return
+        self._last_written = state
+        self._last_write_at = time.monotonic()
+        self.async_write_ha_state()
+
+    def _state_key(self) -> tuple[Any, Any, Any]:
+        return (self.available, self._current_value(), self.extra_state_attributes)
+
+    def _skip_write(self, state: tuple[Any, Any, Any]) -> bool:
+        """Return True if ``state`` does not need to be written."""
+        return state == self._last_written
+
+    def _current_value(self) -> Any:
+        snap = self.coordinator.data
+        if snap is None:
+            return None
+        return self._value_fn(snap)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return extra attributes, if the description defines any.
+
+        While the data is restored from storage, ``data_age`` (seconds)
+        is added so stale values can be told apart.
+        """
+        snap = self.coordinator.data
+        if snap is None:
+            return None
+        attrs = self._attrs_fn(snap) if self._attrs_fn is not None else None
+        if snap.restored:
+            attrs = {**(attrs or {}), ATTR_DATA_AGE: round(snap.age)}
+        return attrs
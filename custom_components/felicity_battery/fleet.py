@@ -0,0 +1,200 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import (
+    BATTERY_CAPACITY_AH,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    FLEET_KEY,
+    FLEET_MAX_CONCURRENT_POLLS,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import FelicityCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Устройство, к которому привязаны сенсоры флота
+FLEET_DEVICE_IDENTIFIER = (DOMAIN, "fleet")
+
+
+@dataclass
+class FleetTotals:
+    """Aggregates over all batteries, computed once per fleet cycle."""
+
+    batteries: int
+    reporting: int  # batteries with fresh data
+    total_power: float | None  # W, + charge / - discharge
+    stored_energy: float | None  # kWh
+    average_soc: float | None  # %
+
+
+class FelicityFleet(DataUpdateCoordinator[FleetTotals]):
+    """Shared poll scheduler and aggregates for all Felicity entries.
+
+    Every battery poll goes through :meth:`async_slot`: poll starts are
+    paced evenly (the shortest current poll interval of the fleet divided
+    by the number of batteries) and at most FLEET_MAX_CONCURRENT_POLLS run
+    at once. Because each coordinator schedules its next poll from the end
+    of the previous one, the offsets persist and after one cycle the polls
+    are spread over the interval instead of firing in one burst.
+
+    A single battery is not paced, and no poll waits longer than its own
+    current interval divided by the number of batteries: a slot booked
+    while the fleet polled slowly must not delay a battery that has just
+    switched to fast polling (or a manual refresh).
+
+    As a coordinator of its own (no I/O) it sums the latest snapshots once
+    per DEFAULT_SCAN_INTERVAL for the fleet sensors. Those belong to one
+    entry's sensor platform (the owner); when the owner leaves, the fleet
+    device and sensors are moved to another loaded entry.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_fleet",
+            update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+        )
+        self.members: dict[str, FelicityCoordinator] = {}
+        # Entry whose sensor platform owns the fleet sensors
+        self.owner: str | None = None
+        # Loaded sensor platforms: entry_id -> adds the fleet sensors there
+        self._platforms: dict[str, Callable[[], None]] = {}
+        self._semaphore = asyncio.Semaphore(FLEET_MAX_CONCURRENT_POLLS)
+        self._next_start = 0.0  # loop.time() of the next free start slot
+
+    def add(self, coordinator: FelicityCoordinator) -> None:
+        self.members[coordinator.entry.entry_id] = coordinator
+
+    def add_platform(self, entry_id: str, add_sensors: Callable[[], None]) -> bool:
+        """Register an entry's sensor platform; return True if it owns the sensors."""
+        self._platforms[entry_id] = add_sensors
+        if self.owner is None:
+            self.owner = entry_id
+        return self.owner == entry_id
+
+    def remove(self, entry_id: str) -> None:
+        """Drop an unloaded entry (its platforms are already unloaded)."""
+        self.members.pop(entry_id, None)
+        self._platforms.pop(entry_id, None)
+        if self.owner != entry_id:
+            return
+        self.owner = None
+        if self._platforms:
+            self._hand_over(entry_id, next(iter(self._platforms)))
+
+    def _hand_over(self, previous: str, owner: str) -> None:
+        """Move the fleet device and sensors from ``previous`` to ``owner``.
+
+        Without this the sensors would stay unloaded until the new owner is
+        reloaded, and deleting ``previous`` would delete them from the
+        registry.
+        """
+        self.owner = owner
+        device_registry = dr.async_get(self.hass)
+        entity_registry = er.async_get(self.hass)
+        device = device_registry.async_get_device(
+            identifiers={FLEET_DEVICE_IDENTIFIER}
+        )
+        if device is not None:
+            # Отключение прежней записи не должно отключать сенсоры флота
+            changes: dict[str, Any] = {}
+            if device.disabled_by is dr.DeviceEntryDisabler.CONFIG_ENTRY:
+                changes["disabled_by"] = None
+            device_registry.async_update_device(
+                device.id,
+                add_config_entry_id=owner,
+                remove_config_entry_id=previous,
+                **changes,
+            )
+            for entity in er.async_entries_for_device(
+                entity_registry, device.id, include_disabled_entities=True
+            ):
+                changes = {"config_entry_id": owner}
+                if entity.disabled_by is er.RegistryEntryDisabler.CONFIG_ENTRY:
+                    changes["disabled_by"] = None
+                entity_registry.async_update_entity(entity.entity_id, **changes)
+        _LOGGER.debug("Fleet sensors moved from entry %s to %s", previous, owner)
+        self._platforms[owner]()
+
+    @property
+    def pacing_gap(self) -> float:
+        """Seconds between two poll starts."""
+        if len(self.members) < 2:
+            return 0.0
+        shortest = min(
+            (
+                c.update_interval.total_seconds()
+                for c in self.members.values()
+                if c.update_interval is not None
+            ),
+            default=DEFAULT_SCAN_INTERVAL,
+        )
+        return shortest / len(self.members)
+
+    @asynccontextmanager
+    async def async_slot(self, interval: float | None = None) -> AsyncIterator[None]:
+        """Wait for this poll's start slot and a free concurrency slot.
+
+        ``interval`` is the caller's current poll interval (seconds).
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        gap = self.pacing_gap
+        start = max(now, self._next_start) if gap else now
+        if interval is not None and gap:
+            # Слот, забронированный при медленном опросе, не держит быстрый
+            start = min(start, now + interval / len(self.members))
+        self._next_start = start + gap
+        if start > now:
+            await asyncio.sleep(start - now)
+        async with self._semaphore:
+            yield
+
+    async def _async_update_data(self) -> FleetTotals:
+        power = 0.0
+        energy = 0.0
+        soc_sum = 0.0
+        reporting = 0
+        for coordinator in self.members.values():
+            snap = coordinator.data
+            if not coordinator.last_update_success or snap is None or snap.restored:
+                continue
+            if snap.power is None or snap.soc is None or snap.voltage is None:
+                continue
+            reporting += 1
+            power += snap.power
+            soc_sum += snap.soc
+            # SOC * ёмкость (А·ч, из ответа пакета) * текущее напряжение
+            capacity = snap.capacity_ah or BATTERY_CAPACITY_AH
+            energy += snap.soc / 100 * capacity * snap.voltage / 1000
+
+        return FleetTotals(
+            batteries=len(self.members),
+            reporting=reporting,
+            total_power=round(power) if reporting else None,
+            stored_energy=round(energy, 2) if reporting else None,
+            average_soc=round(soc_sum / reporting, 1) if reporting else None,
+        )
+
+
+def async_get_fleet(hass: HomeAssistant) -> FelicityFleet:
+    """Return the integration's fleet, creating it on first use."""
+    fleet: FelicityFleet | None = hass.data.get(FLEET_KEY)
+    if fleet is None:
+        fleet = hass.data[FLEET_KEY] = FelicityFleet(hass)
+    return fleet
@@ -0,0 +1,266 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterable
+
+from .snapshot import CELL_EMPTY
+
+# Ярусы истории: имя -> (шаг усреднения, с; ёмкость, строк). 0 = каждый опрос
+HISTORY_TIERS: dict[str, tuple[int, int]] = {
+    "raw": (0, 2880),  # 4 h at 5 s polls, 24 h at 30 s
+    "1min": (60, 1440),  # 24 h
+    "15min": (15 * 60, 2976),  # 31 days
+}
+
+# Колонки в единицах BMS: (имя, typecode, путь в ответе, делитель)
+HISTORY_COLUMNS: tuple[tuple[str, str, tuple[Any, ...], int], ...] = (
+    ("voltage", "i", ("Batt", 0, 0), 1000),  # mV
+    ("current", "h", ("Batt", 1, 0), 10),  # 0.1 A
+    ("soc", "h", ("Batsoc", 0, 0), 100),  # 0.01 %
+    ("temp1", "h", ("BTemp", 0, 0), 10),  # 0.1 °C
+    ("temp2", "h", ("BTemp", 0, 1), 10),  # 0.1 °C
+)
+CELL_DIVISOR = 1000  # mV
+
+# Значение «нет данных» для каждого typecode
+_MISSING = {"h": -(2**15), "i": -(2**31), "H": CELL_EMPTY}
+_LIMITS = {
+    "h": (-(2**15), 2**15 - 1),
+    "i": (-(2**31), 2**31 - 1),
+    "H": (0, 2**16 - 1),
+}
+
+
+def _raw(data: Any, path: tuple[Any, ...], typecode: str) -> int:
+    try:
+        for p in path:
+            data = data[p]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING[typecode]
+    low, high = _LIMITS[typecode]
+    if isinstance(data, int) and low <= data <= high:
+        return data
+    return _MISSING[typecode]
+
+
+def sample_values(data: dict[str, Any]) -> tuple[list[int], int]:
+    """Return the column values and cell voltages of a poll and the cell count.
+
+    Values are in BMS units, HISTORY_COLUMNS first; missing ones are the
+    column's sentinel.
+    """
+    values = [_raw(data, path, code) for _, code, path, _ in HISTORY_COLUMNS]
+    cells = data.get("BatcelList")
+    cells = cells[0] if isinstance(cells, list) and cells else None
+    if not isinstance(cells, list):
+        return values, 0
+    values.extend(_raw(cells, (i,), "H") for i in range(len(cells)))
+    return values, len(cells)
+
+
+class _Ring:
+    """Fixed-capacity rows in preallocated array columns."""
+
+    __slots__ = (
+        "interval",
+        "capacity",
+        "width",
+        "times",
+        "columns",
+        "cells",
+        "head",
+        "count",
+        "_bucket",
+        "_sums",
+        "_counts",
+    )
+
+    def __init__(self, interval: int, capacity: int) -> None:
+        self.interval = interval
+        self.capacity = capacity
+        self.width = 0  # cells per row
+        self.times = array("I", bytes(4 * capacity))  # unix time, s
+        self.columns = [
+            array(code, [_MISSING[code]]) * capacity
+            for _, code, _, _ in HISTORY_COLUMNS
+        ]
+        self.cells = array("H")
+        self.head = 0  # index of the next row to write
+        self.count = 0
+        # Текущее окно усреднения: начало, суммы и число значений
+        self._bucket: int | None = None
+        self._sums: list[int] = []
+        self._counts: list[int] = []
+
+    def widen(self, width: int) -> None:
+        """Grow every row to ``width`` cells, existing rows padded."""
+        old, old_width = self.cells, self.width
+        cells = array("H", [CELL_EMPTY]) * (self.capacity * width)
+        for row in range(self.capacity if old_width else 0):
+            src = row * old_width
+            cells[row * width : row * width + old_width] = old[src : src + old_width]
+        self.cells = cells
+        self.width = width
+        self._sums.extend([0] * (width - old_width))
+        self._counts.extend([0] * (width - old_width))
+
+    def append(self, timestamp: int, values: list[int]) -> None:
+        row = self.head
+        self.times[row] = timestamp
+        for column, value in zip(self.columns, values):
+            column[row] = value
+        if self.width:
+            start = row * self.width
+            self.cells[start : start + self.width] = array(
+                "H", values[len(self.columns) :]
+            )
+        self.head = (row + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def add(self, timestamp: int, values: list[int]) -> None:
+        """Store a sample, or fold it into the current averaging window."""
+        if not self.interval:
+            self.append(timestamp, values)
+            return
+        bucket = timestamp - timestamp % self.interval
+        if bucket != self._bucket:
+            self.flush()
+            self._bucket = bucket
+        missing = self._missing()
+        for i, value in enumerate(values):
+            if value != missing[i]:
+                self._sums[i] += value
+                self._counts[i] += 1
+
+    def flush(self) -> None:
+        """Write the mean of the current window as a row."""
+        if self._bucket is None:
+            self._sums = [0] * (len(self.columns) + self.width)
+            self._counts = [0] * len(self._sums)
+            return
+        missing = self._missing()
+        self.append(
+            self._bucket,
+            [
+                round(total / n) if n else missing[i]
+                for i, (total, n) in enumerate(zip(self._sums, self._counts))
+            ],
+        )
+        self._bucket = None
+        self._sums = [0] * len(self._sums)
+        self._counts = [0] * len(self._counts)
+
+    def _missing(self) -> list[int]:
+        return [_MISSING[code] for _, code, _, _ in HISTORY_COLUMNS] + [
+            CELL_EMPTY
+        ] * self.width
+
+    def ordered(self, values: array, width: int = 1) -> array:
+        """Return a column oldest-first (a copy, unwrapped)."""
+        if self.count < self.capacity:
+            return values[: self.count * width]
+        split = self.head * width
+        return values[split:] + values[:split]
+
+
+class TelemetryHistory:
+    """In-memory history of one battery in compact ``array`` columns.
+
+    Every poll is kept in the ``raw`` tier; the ``1min`` and ``15min``
+    tiers hold the mean of the polls in each window (missing values are
+    left out of the mean), so a day or a month of data is available
+    without the recorder. All tiers are ring buffers of fixed capacity
+    (HISTORY_TIERS) holding values in BMS units (int16/int32, cells
+    uint16); they are scaled only when queried. A window is written once
+    the first poll of the next one arrives.
+    """
+
+    __slots__ = ("tiers",)
+
+    def __init__(self) -> None:
+        self.tiers = {
+            name: _Ring(interval, capacity)
+            for name, (interval, capacity) in HISTORY_TIERS.items()
+        }
+        for ring in self.tiers.values():
+            ring.flush()
+
+    def add(self, timestamp: float, data: dict[str, Any]) -> None:
+        """Add one poll (decoded response, raw units)."""
+        values, width = sample_values(data)
+        for ring in self.tiers.values():
+            if width > ring.width:
+                ring.widen(width)
+            padding = ring.width - width
+            row = values if not padding else values + [CELL_EMPTY] * padding
+            ring.add(int(timestamp), row)
+
+    def columns(
+        self, tier: str, start: float | None = None, end: float | None = None
+    ) -> dict[str, array]:
+        """Return raw columns oldest-first as ``array`` copies.
+
+        ``time`` is unix seconds; ``cells`` is flat, ``width`` per row.
+        """
+        ring = self.tiers[tier]
+        times = ring.ordered(ring.times)
+        first = 0 if start is None else bisect_left(times, start)
+        last = len(times) if end is None else bisect_right(times, end)
+        result = {"time": times[first:last]}
+        for (name, _, _, _), column in zip(HISTORY_COLUMNS, ring.columns):
+            result[name] = ring.ordered(column)[first:last]
+        if ring.width:
+            width = ring.width
+            result["cells"] = ring.ordered(ring.cells, width)[
+                first * width : last * width
+            ]
+        return result
+
+    def query(
+        self,
+        tier: str = "raw",
+        start: float | None = None,
+        end: float | None = None,
+        columns: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        """Return rows of a tier scaled to V/A/%/°C, None where missing."""
+        ring = self.tiers[tier]
+        raw = self.columns(tier, start, end)
+        wanted = set(columns) if columns else None
+        result: dict[str, Any] = {
+            "tier": tier,
+            "interval": ring.interval,
+            "time": raw["time"].tolist(),
+        }
+        for name, code, _, divisor in HISTORY_COLUMNS:
+            if wanted is not None and name not in wanted:
+                continue
+            missing = _MISSING[code]
+            result[name] = [
+                None if v == missing else v / divisor for v in raw[name]
+            ]
+        if "cells" in raw and (wanted is None or "cells" in wanted):
+            flat = [
+                None if v == CELL_EMPTY else v / CELL_DIVISOR for v in raw["cells"]
+            ]
+            width = ring.width
+            result["cells"] = [
+                flat[i : i + width] for i in range(0, len(flat), width)
+            ]
+        return result
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {
+                "rows": ring.count,
+                "capacity": ring.capacity,
+                "cells": ring.width,
+                "bytes": ring.times.itemsize * ring.capacity
+                + sum(c.itemsize * len(c) for c in ring.columns)
+                + ring.cells.itemsize * len(ring.cells),
+            }
+            for name, ring in self.tiers.items()
+        }
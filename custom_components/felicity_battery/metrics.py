@@ -0,0 +1,125 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from collections import deque
+from typing import Any
+
+# Сколько последних замеров держим для перцентилей
+METRICS_WINDOW = 200
+
+
+class RollingStats:
+    """Rolling window of samples with percentile summaries."""
+
+    __slots__ = ("_samples", "total")
+
+    def __init__(self, size: int = METRICS_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self.total = 0  # samples ever added
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        self.total += 1
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the ``pct`` percentile (nearest rank) of the window."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    @property
+    def last(self) -> float | None:
+        return self._samples[-1] if self._samples else None
+
+    def as_dict(self, scale: float = 1.0, digits: int = 3) -> dict[str, Any]:
+        """Summary for diagnostics; values multiplied by ``scale``."""
+        if not self._samples:
+            return {"count": self.total}
+
+        def _fmt(value: float | None) -> float | None:
+            return round(value * scale, digits) if value is not None else None
+
+        return {
+            "count": self.total,
+            "last": _fmt(self.last),
+            "p50": _fmt(self.percentile(50)),
+            "p95": _fmt(self.percentile(95)),
+            "max": _fmt(max(self._samples)),
+        }
+
+
+class TransportMetrics:
+    """Per-phase timings of the requests sent to one module (host:port).
+
+    Phases: ``connect`` (TCP handshake), ``send`` (write + drain), ``wait``
+    (command sent -> first response byte), ``read`` (first byte -> frame
+    complete). Seconds.
+    """
+
+    PHASES = ("connect", "send", "wait", "read")
+
+    def __init__(self) -> None:
+        self.phases: dict[str, RollingStats] = {
+            phase: RollingStats() for phase in self.PHASES
+        }
+        self.bytes: dict[str, RollingStats] = {}
+        self.retries = 0
+        self.failures = 0
+
+    def add_bytes(self, command: str, count: int) -> None:
+        stats = self.bytes.get(command)
+        if stats is None:
+            stats = self.bytes[command] = RollingStats()
+        stats.add(count)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "phases_ms": {
+                phase: stats.as_dict(1000, 2) for phase, stats in self.phases.items()
+            },
+            "bytes_per_command": {
+                command: stats.as_dict(1, 0) for command, stats in self.bytes.items()
+            },
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+class PollMetrics:
+    """Timings and outcome of whole polls of one battery."""
+
+    def __init__(self) -> None:
+        self.latency = RollingStats()  # s, whole async_get_data
+        self.parse = RollingStats()  # s, parsing of all sections of a poll
+        self.bytes = RollingStats()  # bytes received per poll
+        self.fanout = RollingStats()  # s, event loop time in entity updates
+        self.polls = 0
+        self.failures = 0
+        self._outcomes: deque[bool] = deque(maxlen=METRICS_WINDOW)
+
+    def record(self, ok: bool) -> None:
+        self.polls += 1
+        if not ok:
+            self.failures += 1
+        self._outcomes.append(ok)
+
+    @property
+    def failure_rate(self) -> float | None:
+        """Share of failed polls in the window, percent."""
+        if not self._outcomes:
+            return None
+        failed = self._outcomes.count(False)
+        return round(failed * 100 / len(self._outcomes), 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "polls": self.polls,
+            "failures": self.failures,
+            "failure_rate_pct": self.failure_rate,
+            "latency_ms": self.latency.as_dict(1000, 2),
+            "parse_ms": self.parse.as_dict(1000, 3),
+            "bytes_per_poll": self.bytes.as_dict(1, 0),
+            "entity_update_ms": self.fanout.as_dict(1000, 3),
+        }
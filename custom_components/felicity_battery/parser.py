@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""Parsers for the Felicity payloads ('dev real infor', 'dev set infor').
+
+The module usually answers with valid JSON, but some firmwares use single
+quotes or Python's ``None``. :func:`parse_real_payload` decodes the payload
+with strict ``json.loads`` (after swapping quotes and Python literals) and
+extracts all fields from the result in one go. Only when that fails does it
+fall back to :func:`tolerant_loads`, a single-pass tokenizer.
+:func:`parse_real_payload_regex` is the original per-field regex parser,
+kept as the reference implementation for benchmarks and equivalence checks.
+
+The settings reply is several concatenated objects; :class:`SettingsDecoder`
+decodes and merges them one by one with ``raw_decode``
+(:func:`parse_settings_payload_splitter` is the original splitter).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict
+
+_LOGGER = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<punct>[{}\[\]:,])
+      | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<num>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<word>[A-Za-z_]+)
+    )""",
+    re.VERBOSE,
+)
+
+_PY_LITERAL_RE = re.compile(r"([\[,:]\s*)(None|True|False)\b")
+_PY_TO_JSON = {"None": "null", "True": "true", "False": "false"}
+
+_WORDS: dict[str, Any] = {
+    "null": None,
+    "None": None,
+    "true": True,
+    "True": True,
+    "false": False,
+    "False": False,
+}
+
+
+def parse_real_payload(text: str) -> Dict[str, Any]:
+    """Parse 'dev real infor' payload into the dict used by the coordinator."""
+    obj: Any = None
+    start = text.find("{")
+    end = text.rfind("}")
+    if start != -1 and end > start:
+        norm = text[start : end + 1].replace("'", '"')
+        if "None" in norm or "True" in norm or "False" in norm:
+            # Python-литералы вместо JSON: заменяем только значения (после
+            # '[', ',' или ':'), строки не трогаем
+            norm = _PY_LITERAL_RE.sub(_py_literal_to_json, norm)
+        try:
+            obj = json.loads(norm)
+        except ValueError:
+            obj = None
+
+    if not isinstance(obj, dict):
+        # Не-JSON (кавычки внутри строк, мусор, обрезанный кадр)
+        obj = tolerant_loads(text)
+
+    return extract_real_fields(obj)
+
+
+def _py_literal_to_json(match: re.Match[str]) -> str:
+    return match.group(1) + _PY_TO_JSON[match.group(2)]
+
+
+def extract_real_fields(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick and normalise the fields we use from a decoded payload.
+
+    Produces exactly what :func:`parse_real_payload_regex` would.
+    """
+    get = obj.get
+    bwarn = get("Bwarn")
+    result: Dict[str, Any] = {
+        "CommVer": _as_int(get("CommVer")),
+        "wifiSN": _as_str(get("wifiSN")),
+        "DevSN": _as_str(get("DevSN")),
+        "Estate": _as_int(get("Estate")),
+        "Bfault": _as_int(get("Bfault")),
+        "Bwarn": bwarn if type(bwarn) is int else 0,
+    }
+
+    # Batt: [[53300],[1],[null]]
+    try:
+        (v,), (i,), third_row = get("Batt")
+        third = third_row[0] if third_row else None
+        if (
+            type(v) is int
+            and type(i) is int
+            and len(third_row) <= 1
+            and (third is None or type(third) is int)
+        ):
+            result["Batt"] = [[v], [i], [third]]
+    except (TypeError, ValueError, IndexError, KeyError):
+        pass
+
+    # Batsoc: [[9900,1000,250000]]
+    try:
+        ((soc, scale, cap),) = get("Batsoc")
+        if type(soc) is int and type(scale) is int and type(cap) is int:
+            result["Batsoc"] = [[soc, scale, cap]]
+    except (TypeError, ValueError, IndexError, KeyError):
+        pass
+
+    # BMaxMin: [[3345,3338],[6,7]], LVolCur: [[576,480],[100,1500]]
+    rows = _int_pairs(get("BMaxMin"), 2)
+    if rows is not None:
+        result["BMaxMin"] = rows
+    rows = _int_pairs(get("LVolCur"), 2)
+    if rows is not None:
+        result["LVolCur"] = rows
+
+    # BTemp: [[t1,t2]] or [[t1,t2],[t3,t4]]; older firmwares send Templist
+    btemp = get("BTemp")
+    rows = _int_pairs(btemp, 2) or _int_pairs(btemp, 1)
+    if rows is None:
+        rows = _int_pairs(get("Templist"), 1, exact=False)
+    if rows is not None:
+        result["BTemp"] = rows
+
+    # BatcelList: [[3340,3341,...]]
+    try:
+        row = get("BatcelList")[0]
+        if row and {*map(type, row)} == _INT_TYPE:
+            result["BatcelList"] = [list(row)]
+    except (TypeError, IndexError, KeyError):
+        pass
+
+    return result
+
+
+_INT_TYPE = {int}
+
+
+def _as_int(value: Any) -> int | None:
+    return value if type(value) is int else None
+
+
+def _as_str(value: Any) -> str | None:
+    return value if isinstance(value, str) else None
+
+
+def _int_pairs(value: Any, count: int, exact: bool = True) -> list[list[int]] | None:
+    """Return the first ``count`` rows of value if they are [int, int] pairs.
+
+    With ``exact`` the value must hold exactly ``count`` rows (BTemp); else
+    extra rows are ignored (Templist).
+    """
+    if not isinstance(value, list) or len(value) < count:
+        return None
+    if exact and len(value) != count:
+        return None
+    rows: list[list[int]] = []
+    for row in value[:count]:
+        try:
+            a, b = row
+        except (TypeError, ValueError):
+            return None
+        if type(a) is not int or type(b) is not int:
+            return None
+        rows.append([a, b])
+    return rows
+
+
+def tolerant_loads(text: str) -> Dict[str, Any]:
+    """Decode the first top-level object of a JSON-like payload.
+
+    Single pass over the text; accepts single- or double-quoted strings,
+    ``None``/``True``/``False`` and skips unknown bytes. If the frame is
+    truncated, the complete top-level fields are kept and the unfinished
+    one is dropped.
+    """
+    root: Any = None
+    # Стек открытых контейнеров: [контейнер, ожидающий ключ]
+    stack: list[list[Any]] = []
+    match = _TOKEN_RE.match
+    pos = 0
+    size = len(text)
+
+    while pos < size:
+        m = match(text, pos)
+        if m is None:
+            pos += 1
+            continue
+        pos = m.end()
+        kind = m.lastgroup
+
+        if kind == "punct":
+            ch = m.group("punct")
+            if ch == "{" or ch == "[":
+                value: Any = {} if ch == "{" else []
+                if stack:
+                    _attach(stack[-1], value)
+                elif root is None:
+                    root = value
+                else:
+                    continue
+                stack.append([value, None])
+            elif ch == "}" or ch == "]":
+                if stack:
+                    stack.pop()
+                    if not stack:
+                        break
+            continue
+
+        if not stack:
+            continue
+
+        if kind == "str":
+            value = raw = m.group("str")[1:-1]
+            if "\\" in raw:
+                try:
+                    value = raw.encode().decode("unicode_escape")
+                except UnicodeDecodeError:
+                    pass  # битая escape-последовательность: строка как есть
+        elif kind == "num":
+            raw = m.group("num")
+            value = int(raw) if raw.lstrip("-").isdigit() else float(raw)
+        else:
+            word = m.group("word")
+            value = _WORDS.get(word, word)
+
+        top = stack[-1]
+        if isinstance(top[0], dict) and top[1] is None:
+            if isinstance(value, str):
+                top[1] = value
+            continue
+        _attach(top, value)
+
+    if len(stack) > 1 and isinstance(root, dict) and root:
+        # Обрезанный кадр: недополученное значение верхнего уровня отбрасываем
+        root.popitem()
+
+    return root if isinstance(root, dict) else {}
+
+
+def _attach(top: list[Any], value: Any) -> None:
+    container = top[0]
+    if isinstance(container, list):
+        container.append(value)
+    elif top[1] is not None:
+        container[top[1]] = value
+        top[1] = None
+
+
+def parse_real_payload_regex(text: str) -> Dict[str, Any]:
+    """Parse 'dev real infor' payload with one regex per field (reference)."""
+    norm = text.replace("'", '"')
+    last_brace = norm.rfind("}")
+    if last_brace != -1:
+        norm = norm[: last_brace + 1]
+
+    result: Dict[str, Any] = {}
+
+    def _find_str(key: str) -> str | None:
+        m = re.search(rf'"{key}"\s*:\s*"([^"]*)"', norm)
+        return m.group(1) if m else None
+
+    def _find_int(key: str) -> int | None:
+        m = re.search(rf'"{key}"\s*:\s*([-0-9]+)', norm)
+        return int(m.group(1)) if m else None
+
+    # Simple fields
+    result["CommVer"] = _find_int("CommVer")
+    result["wifiSN"] = _find_str("wifiSN")
+    result["DevSN"] = _find_str("DevSN")
+    result["Estate"] = _find_int("Estate")
+    result["Bfault"] = _find_int("Bfault")
+    result["Bwarn"] = _find_int("Bwarn") or 0
+
+    # Batt: [[53300],[1],[null]]
+    m = re.search(
+        r'"Batt"\s*:\s*\[\s*\[\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*\]\s*,\s*\[\s*(null|None|[-0-9]+)?\s*\]\s*\]',
+        norm,
+    )
+    if m:
+        v = int(m.group(1))
+        i = int(m.group(2))
+        third_raw = m.group(3)
+        third = None
+        if third_raw not in (None, "null", "None", ""):
+            third = int(third_raw)
+        result["Batt"] = [[v], [i], [third]]
+
+    # Batsoc: [[9900,1000,250000]]
+    m = re.search(
+        r'"Batsoc"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
+        norm,
+    )
+    if m:
+        soc = int(m.group(1))
+        scale = int(m.group(2))
+        cap = int(m.group(3))
+        result["Batsoc"] = [[soc, scale, cap]]
+
+    # BMaxMin: [[3345,3338],[6,7]]
+    m = re.search(
+        r'"BMaxMin"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
+        norm,
+    )
+    if m:
+        max_v = int(m.group(1))
+        min_v = int(m.group(2))
+        max_i = int(m.group(3))
+        min_i = int(m.group(4))
+        result["BMaxMin"] = [[max_v, min_v], [max_i, min_i]]
+
+    # LVolCur: [[576,480],[100,1500]]
+    m = re.search(
+        r'"LVolCur"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]\s*\]',
+        norm,
+    )
+    if m:
+        v1 = int(m.group(1))
+        v2 = int(m.group(2))
+        c1 = int(m.group(3))
+        c2 = int(m.group(4))
+        result["LVolCur"] = [[v1, v2], [c1, c2]]
+
+    # BTemp
+    btemp = None
+    m = re.search(
+        r'"BTemp"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]'
+        r'(?:\s*,\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\])?\s*\]',
+        norm,
+    )
+    if m:
+        t1 = int(m.group(1))
+        t2 = int(m.group(2))
+        if m.group(3) is not None and m.group(4) is not None:
+            t3 = int(m.group(3))
+            t4 = int(m.group(4))
+            btemp = [[t1, t2], [t3, t4]]
+        else:
+            btemp = [[t1, t2]]
+    else:
+        m = re.search(
+            r'"Templist"\s*:\s*\[\s*\[\s*([-0-9]+)\s*,\s*([-0-9]+)\s*\]',
+            norm,
+        )
+        if m:
+            t1 = int(m.group(1))
+            t2 = int(m.group(2))
+            btemp = [[t1, t2]]
+    if btemp is not None:
+        result["BTemp"] = btemp
+
+    # BatcelList
+    m = re.search(r'"BatcelList"\s*:\s*\[\s*\[([0-9,\s-]+)\]', norm)
+    if m:
+        cells_str = m.group(1)
+        try:
+            cells = [int(x) for x in cells_str.split(",") if x.strip() != ""]
+            result["BatcelList"] = [cells]
+        except Exception:
+            _LOGGER.debug("Failed to parse BatcelList from %r", cells_str)
+
+    return result
+
+
+# Граница между склеенными объектами: '}' и сразу следующий '{'
+_OBJECT_GAP_RE = re.compile(r"\}\s*\{")
+
+
+class SettingsDecoder:
+    """Incremental decoder for the concatenated objects of 'dev set infor'.
+
+    :meth:`feed` accepts the reply in pieces of any size. Every complete
+    object is decoded with ``json.JSONDecoder.raw_decode`` from where the
+    previous one ended and merged into :attr:`merged` right away. An object
+    that fails to decode is recorded in :attr:`errors` and skipped up to the
+    next object boundary; text already consumed is never scanned again.
+    """
+
+    def __init__(self) -> None:
+        self.merged: Dict[str, Any] = {}
+        self.objects = 0  # objects merged so far
+        self.errors: list[str] = []
+        self._decode = json.JSONDecoder().raw_decode
+        self._pending = ""  # unfinished object carried over to the next feed
+        self._offset = 0  # stream offset of _pending, for error messages
+
+    def feed(self, text: str) -> None:
+        """Decode the objects completed by the next piece of the reply."""
+        if "'" in text:
+            text = text.replace("'", '"')
+        buf = self._pending + text if self._pending else text
+        pos = 0
+        while True:
+            start = buf.find("{", pos)
+            if start < 0:
+                pos = len(buf)
+                break
+            try:
+                obj, pos = self._decode(buf, start)
+            except json.JSONDecodeError as err:
+                gap = _OBJECT_GAP_RE.search(buf, err.pos)
+                if gap is None:
+                    # Объект ещё не пришёл целиком (или битый последний)
+                    pos = start
+                    break
+                self._fail(start, err.msg)
+                pos = gap.end() - 1
+                continue
+            if isinstance(obj, dict):
+                self.merged.update(obj)
+                self.objects += 1
+            else:
+                self._fail(start, "not an object")
+
+        self._offset += pos
+        self._pending = buf[pos:]
+
+    def close(self) -> Dict[str, Any]:
+        """Finish the reply; an unfinished last object counts as failed."""
+        if "{" in self._pending:
+            self._fail(self._pending.index("{"), "unterminated object")
+        self._offset += len(self._pending)
+        self._pending = ""
+        return self.merged
+
+    def _fail(self, start: int, reason: str) -> None:
+        index = self.objects + len(self.errors) + 1
+        self.errors.append(f"object #{index} at {self._offset + start}: {reason}")
+
+
+def parse_settings_payload(text: str) -> Dict[str, Any]:
+    """Merge the JSON objects of a 'dev set infor' payload into one dict."""
+    decoder = SettingsDecoder()
+    decoder.feed(text)
+    merged = decoder.close()
+    for error in decoder.errors:
+        _LOGGER.debug("Skip invalid part in settings: %s", error)
+    return merged
+
+
+def parse_settings_payload_splitter(text: str) -> Dict[str, Any]:
+    """Original per-character splitter for 'dev set infor' (reference)."""
+    set_text = text.replace("'", '"').strip()
+    merged: Dict[str, Any] = {}
+
+    # Разбираем несколько JSON-объектов подряд:
+    depth = 0
+    start = None
+    json_objects: list[str] = []
+
+    for i, ch in enumerate(set_text):
+        if ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}":
+            if depth > 0:
+                depth -= 1
+                if depth == 0 and start is not None:
+                    json_objects.append(set_text[start : i + 1])
+                    start = None
+
+    # На всякий случай fallback на простое регулярное выражение
+    if not json_objects:
+        json_objects = re.findall(r"\{.*?\}", set_text)
+
+    for obj in json_objects:
+        try:
+            part = json.loads(obj)
+            merged.update(part)
+        except Exception as e:
+            _LOGGER.debug("Skip invalid part in settings: %s", e)
+            continue
+
+    return merged
@@ -1,10 +1,16 @@
 from __future__ import annotations
 # -*- coding: utf-8 -*-
 
+from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter
+import re
+import time
 from typing import Any
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
@@ -12,25 +18,131 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    CONF_HOST,
     PERCENTAGE,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfInformation,
     UnitOfPower,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .api import BREAKER_STATES
+from .const import DEADBAND_MAX_AGE, DOMAIN
+from .coordinator import FelicityCoordinator
+from .entity import ATTR_STALE, AttrsFn, FelicityEntity, ValueFn
+from .fleet import (
+    FLEET_DEVICE_IDENTIFIER,
+    FelicityFleet,
+    FleetTotals,
+    async_get_fleet,
+)
+from .metrics import RollingStats
+from .snapshot import FelicitySnapshot
+
+
+# Сенсоры ячеек создаются по длине BatcelList; лишние удаляются, только
+# если меньшее число ячеек держится столько времени без перерыва
+CELL_REMOVE_CONFIRM_TIME = 15 * 60  # seconds
+_CELL_KEY_RE = re.compile(r"_cell_(\d+)_v$")
+# Крупные атрибуты, которые не пишутся в recorder
+ATTR_CELLS = "cells"
+ATTR_BASIC = "basic"
+ATTR_SETTINGS = "settings"
+# Рабочий диапазон напряжения LFP-ячейки, В
+CELL_VOLTAGE_RANGE = (2.5, 3.65)
 
 
-@dataclass
+@dataclass(kw_only=True)
 class FelicitySensorDescription(SensorEntityDescription):
     """Extended description for Felicity sensors."""
 
+    value_fn: ValueFn
+    attrs_fn: AttrsFn | None = None
+    # Cached section ("_basic"/"_settings") the value comes from, if any
+    section: str | None = None
+
+    # Significant-change filter: a new value closer than the deadband to the
+    # last written one is not written, unless max_age seconds have passed.
+    # Either absolute (native units) or percent of value_range.
+    deadband: float | None = None
+    deadband_pct: float | None = None
+    value_range: tuple[float, float] | None = None
+    max_age: float = DEADBAND_MAX_AGE
+
+    def resolved_deadband(self) -> float | None:
+        """Return the deadband in native units, if any."""
+        if self.deadband is not None:
+            return self.deadband
+        if self.deadband_pct is not None and self.value_range is not None:
+            low, high = self.value_range
+            return (high - low) * self.deadband_pct / 100
+        return None
+
+
+@dataclass(kw_only=True)
+class FelicityDiagnosticSensorDescription(SensorEntityDescription):
+    """Sensor computed from the coordinator's poll metrics."""
+
+    value_fn: Callable[[FelicityCoordinator], Any]
+    attrs_fn: Callable[[FelicityCoordinator], "dict[str, Any] | None"] | None = None
+
+
+@dataclass(kw_only=True)
+class FelicityFleetSensorDescription(SensorEntityDescription):
+    """Sensor over the aggregates of all batteries."""
+
+    value_fn: Callable[[FleetTotals], Any]
+
+
+def _cell_description(n: int) -> FelicitySensorDescription:
+    return FelicitySensorDescription(
+        key=f"cell_{n}_v",
+        name=f"Cell {n} Voltage",
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:battery",
+        suggested_display_precision=3,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda snap: snap.cell(n - 1),
+        deadband_pct=0.2,
+        value_range=CELL_VOLTAGE_RANGE,
+    )
+
+
+def _cell_drift_attrs(snap: FelicitySnapshot) -> dict[str, Any] | None:
+    """Агрегация по ячейкам для сенсора cell_drift."""
+    cells_v = [c for c in snap.cells if c is not None]
+    if not cells_v:
+        return None
+    max_v = max(cells_v)
+    min_v = min(cells_v)
+    return {
+        ATTR_CELLS: cells_v,
+        "max_cell_voltage": max_v,
+        "min_cell_voltage": min_v,
+        "max_cell_index": cells_v.index(max_v) + 1,
+        "min_cell_index": cells_v.index(min_v) + 1,
+    }
+
+
+def _info_state(snap: FelicitySnapshot) -> str:
+    if snap.basic is None or snap.settings is None:
+        return "missing"
+    return "stale" if snap.stale_sections else "fresh"
+
+
+def _info_attrs(snap: FelicitySnapshot) -> dict[str, Any] | None:
+    return {ATTR_BASIC: snap.basic, ATTR_SETTINGS: snap.settings}
+
 
 SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
     # --- Основные рабочие сенсоры ---
@@ -42,6 +154,7 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:battery",
         suggested_display_precision=1,
+        value_fn=attrgetter("soc"),
     ),
     FelicitySensorDescription(
         key="voltage",
@@ -51,6 +164,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:current-dc",
         suggested_display_precision=2,
+        value_fn=attrgetter("voltage"),
+        deadband=0.05,
     ),
     FelicitySensorDescription(
         key="current",
@@ -60,6 +175,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:current-dc",
         suggested_display_precision=1,
+        value_fn=attrgetter("current"),
+        deadband=0.2,
     ),
     FelicitySensorDescription(
         key="power",
@@ -68,6 +185,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:flash",
+        value_fn=attrgetter("power"),
+        deadband=20,
     ),
     # Разделённые токи/мощности
     FelicitySensorDescription(
@@ -78,6 +197,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:current-dc",
         suggested_display_precision=1,
+        value_fn=attrgetter("charge_current"),
+        deadband=0.2,
     ),
     FelicitySensorDescription(
         key="discharge_current",
@@ -87,6 +208,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:current-dc",
         suggested_display_precision=1,
+        value_fn=attrgetter("discharge_current"),
+        deadband=0.2,
     ),
     FelicitySensorDescription(
         key="charge_power",
@@ -95,6 +218,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:flash",
+        value_fn=attrgetter("charge_power"),
+        deadband=20,
     ),
     FelicitySensorDescription(
         key="discharge_power",
@@ -103,11 +228,14 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:flash",
+        value_fn=attrgetter("discharge_power"),
+        deadband=20,
     ),
     FelicitySensorDescription(
         key="direction",
         name="Battery Direction",
         icon="mdi:swap-vertical",
+        value_fn=attrgetter("direction"),
     ),
     FelicitySensorDescription(
         key="temp1",
@@ -117,6 +245,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:thermometer",
         suggested_display_precision=1,
+        value_fn=attrgetter("temp1"),
+        deadband=0.2,
     ),
     FelicitySensorDescription(
         key="temp2",
@@ -126,6 +256,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:thermometer",
         suggested_display_precision=1,
+        value_fn=attrgetter("temp2"),
+        deadband=0.2,
     ),
 
     # --- Диагностика по ячейкам ---
@@ -138,6 +270,9 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:battery-high",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("max_cell_v"),
+        deadband_pct=0.2,
+        value_range=CELL_VOLTAGE_RANGE,
     ),
     FelicitySensorDescription(
         key="min_cell_v",
@@ -148,180 +283,10 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:battery-low",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("min_cell_v"),
+        deadband_pct=0.2,
+        value_range=CELL_VOLTAGE_RANGE,
     ),
-    FelicitySensorDescription(
-        key="cell_drift",
-        name="Cell Voltage Drift",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:chart-bell-curve",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-
-    # --- Напряжения ячеек 1–16 (диагностика) ---
-    FelicitySensorDescription(
-        key="cell_1_v",
-        name="Cell 1 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_2_v",
-        name="Cell 2 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_3_v",
-        name="Cell 3 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_4_v",
-        name="Cell 4 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_5_v",
-        name="Cell 5 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_6_v",
-        name="Cell 6 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_7_v",
-        name="Cell 7 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_8_v",
-        name="Cell 8 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_9_v",
-        name="Cell 9 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_10_v",
-        name="Cell 10 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_11_v",
-        name="Cell 11 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_12_v",
-        name="Cell 12 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_13_v",
-        name="Cell 13 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_14_v",
-        name="Cell 14 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_15_v",
-        name="Cell 15 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-    FelicitySensorDescription(
-        key="cell_16_v",
-        name="Cell 16 Voltage",
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        icon="mdi:battery",
-        suggested_display_precision=3,
-        entity_category=EntityCategory.DIAGNOSTIC,
-    ),
-
     # --- Лимиты по фактическим данным ---
     FelicitySensorDescription(
         key="max_charge_current",
@@ -332,6 +297,7 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:current-ac",
         suggested_display_precision=1,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("max_charge_current"),
     ),
     FelicitySensorDescription(
         key="max_discharge_current",
@@ -342,6 +308,7 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:current-ac",
         suggested_display_precision=1,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("max_discharge_current"),
     ),
 
     # --- Состояние / коды ---
@@ -349,18 +316,21 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         key="state",
         name="Battery State",
         icon="mdi:battery-heart",
+        value_fn=attrgetter("state"),
     ),
     FelicitySensorDescription(
         key="fault",
         name="Battery Fault Code",
         icon="mdi:alert",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("fault"),
     ),
     FelicitySensorDescription(
         key="warning",
         name="Battery Warning Code",
         icon="mdi:alert-circle",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("warning"),
     ),
 
     # --- Инфо / прошивки / тип / серийники ---
@@ -369,42 +339,54 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         name="Battery FW Version",
         icon="mdi:chip",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("fw_version"),
+        section="_basic",
     ),
     FelicitySensorDescription(
         key="bms_m1_fw",
         name="Battery BMS M1 FW",
         icon="mdi:chip",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("bms_m1_fw"),
+        section="_basic",
     ),
     FelicitySensorDescription(
         key="bms_m2_fw",
         name="Battery BMS M2 FW",
         icon="mdi:chip",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("bms_m2_fw"),
+        section="_basic",
     ),
     FelicitySensorDescription(
         key="battery_type",
         name="Battery Type",
         icon="mdi:identifier",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("battery_type"),
+        section="_basic",
     ),
     FelicitySensorDescription(
         key="battery_subtype",
         name="Battery SubType",
         icon="mdi:identifier",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("battery_subtype"),
+        section="_basic",
     ),
     FelicitySensorDescription(
         key="serial",
         name="Battery Serial",
         icon="mdi:identifier",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("serial"),
     ),
     FelicitySensorDescription(
         key="wifi_serial",
         name="WiFi Module Serial",
         icon="mdi:wifi",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("wifi_serial"),
     ),
 
     # --- Настройки / пороги (dev set infor) ---
@@ -413,6 +395,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         name="Battery Pack Count",
         icon="mdi:battery-variant",
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("ttl_pack"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="cell_v_80",
@@ -423,6 +407,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:battery-80",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("cell_v_80"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="cell_v_20",
@@ -433,6 +419,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:battery-20",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("cell_v_20"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="cell_over_voltage",
@@ -443,6 +431,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:flash-alert",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("cell_over_voltage"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="cell_under_voltage",
@@ -453,6 +443,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:flash-alert-outline",
         suggested_display_precision=3,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("cell_under_voltage"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="charge_limit_setting",
@@ -463,6 +455,8 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:current-ac",
         suggested_display_precision=1,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("charge_limit_setting"),
+        section="_settings",
     ),
     FelicitySensorDescription(
         key="discharge_limit_setting",
@@ -473,6 +467,196 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
         icon="mdi:current-ac",
         suggested_display_precision=1,
         entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=attrgetter("discharge_limit_setting"),
+        section="_settings",
+    ),
+)
+
+
+def _ms(stats: RollingStats, pct: float) -> float | None:
+    value = stats.percentile(pct)
+    return round(value * 1000, 1) if value is not None else None
+
+
+def _poll_phase_attrs(coordinator: FelicityCoordinator) -> dict[str, Any]:
+    """p95 по фазам опроса, мс."""
+    client = coordinator.client
+    attrs = {
+        f"{phase}_p95_ms": _ms(stats, 95)
+        for phase, stats in client.transport_metrics.phases.items()
+    }
+    attrs["parse_p95_ms"] = _ms(client.poll_metrics.parse, 95)
+    attrs["entity_update_p95_ms"] = _ms(client.poll_metrics.fanout, 95)
+    return attrs
+
+
+def _breaker_attrs(coordinator: FelicityCoordinator) -> dict[str, Any]:
+    stats = coordinator.client.breaker_stats
+    return {
+        "consecutive_failures": stats["consecutive_failures"],
+        "times_opened": stats["times_opened"],
+        "open_time": stats["open_time"],
+    }
+
+
+def _poll_failure_attrs(coordinator: FelicityCoordinator) -> dict[str, Any]:
+    metrics = coordinator.client.poll_metrics
+    transport = coordinator.client.transport_metrics
+    return {
+        "polls": metrics.polls,
+        "failed_polls": metrics.failures,
+        "request_retries": transport.retries,
+        "request_failures": transport.failures,
+    }
+
+
+DIAGNOSTIC_SENSOR_DESCRIPTIONS: tuple[FelicityDiagnosticSensorDescription, ...] = (
+    FelicityDiagnosticSensorDescription(
+        key="connection_circuit",
+        name="Connection Circuit",
+        device_class=SensorDeviceClass.ENUM,
+        options=list(BREAKER_STATES),
+        icon="mdi:electric-switch",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.client.breaker_state,
+        attrs_fn=_breaker_attrs,
+    ),
+    # Poll metrics are disabled by default: values change on every poll
+    FelicityDiagnosticSensorDescription(
+        key="poll_latency_p50",
+        name="Poll Latency p50",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:timer-outline",
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: _ms(coordinator.client.poll_metrics.latency, 50),
+    ),
+    FelicityDiagnosticSensorDescription(
+        key="poll_latency_p95",
+        name="Poll Latency p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:timer-alert-outline",
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: _ms(coordinator.client.poll_metrics.latency, 95),
+        attrs_fn=_poll_phase_attrs,
+    ),
+    FelicityDiagnosticSensorDescription(
+        key="poll_failure_rate",
+        name="Poll Failure Rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:lan-disconnect",
+        suggested_display_precision=1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: coordinator.client.poll_metrics.failure_rate,
+        attrs_fn=_poll_failure_attrs,
+    ),
+    FelicityDiagnosticSensorDescription(
+        key="poll_bytes",
+        name="Bytes per Poll",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:download-network-outline",
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda coordinator: coordinator.client.poll_metrics.bytes.percentile(
+            50
+        ),
+    ),
+)
+
+
+CELL_DRIFT_DESCRIPTION = FelicitySensorDescription(
+    key="cell_drift",
+    name="Cell Voltage Drift",
+    native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+    device_class=SensorDeviceClass.VOLTAGE,
+    state_class=SensorStateClass.MEASUREMENT,
+    icon="mdi:chart-bell-curve",
+    suggested_display_precision=3,
+    entity_category=EntityCategory.DIAGNOSTIC,
+    value_fn=attrgetter("cell_drift"),
+    attrs_fn=_cell_drift_attrs,
+)
+
+# Полные ответы basic/settings — только здесь и без записи в recorder
+INFO_DESCRIPTION = FelicitySensorDescription(
+    key="battery_info",
+    name="Battery Info",
+    device_class=SensorDeviceClass.ENUM,
+    options=["fresh", "stale", "missing"],
+    icon="mdi:information-outline",
+    entity_category=EntityCategory.DIAGNOSTIC,
+    value_fn=_info_state,
+    attrs_fn=_info_attrs,
+)
+
+# Энергия интегрируется в координаторе; итоги переживают перезапуск
+ENERGY_SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
+    FelicitySensorDescription(
+        key="charge_energy",
+        name="Battery Charge Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:battery-arrow-up",
+        suggested_display_precision=2,
+        value_fn=attrgetter("charge_energy"),
+        deadband=0.01,
+    ),
+    FelicitySensorDescription(
+        key="discharge_energy",
+        name="Battery Discharge Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:battery-arrow-down",
+        suggested_display_precision=2,
+        value_fn=attrgetter("discharge_energy"),
+        deadband=0.01,
+    ),
+)
+
+
+FLEET_SENSOR_DESCRIPTIONS: tuple[FelicityFleetSensorDescription, ...] = (
+    FelicityFleetSensorDescription(
+        key="total_power",
+        name="Total Power",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:flash",
+        value_fn=lambda totals: totals.total_power,
+    ),
+    FelicityFleetSensorDescription(
+        key="stored_energy",
+        name="Stored Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY_STORAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:home-battery",
+        suggested_display_precision=2,
+        value_fn=lambda totals: totals.stored_energy,
+    ),
+    FelicityFleetSensorDescription(
+        key="average_soc",
+        name="Average SOC",
+        native_unit_of_measurement=PERCENTAGE,
+        device_class=SensorDeviceClass.BATTERY,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:battery",
+        suggested_display_precision=1,
+        value_fn=lambda totals: totals.average_soc,
     ),
 )
 
@@ -486,16 +670,131 @@ async def async_setup_entry(
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator = data["coordinator"]
 
-    entities: list[FelicitySensor] = [
+    entities: list[SensorEntity] = [
         FelicitySensor(coordinator, entry, desc) for desc in SENSOR_DESCRIPTIONS
     ]
+    entities.append(FelicityCellDriftSensor(coordinator, entry, CELL_DRIFT_DESCRIPTION))
+    entities.append(FelicityInfoSensor(coordinator, entry, INFO_DESCRIPTION))
+    entities.extend(
+        FelicityEnergySensor(coordinator, entry, desc)
+        for desc in ENERGY_SENSOR_DESCRIPTIONS
+    )
+    entities.extend(
+        FelicityDiagnosticSensor(coordinator, entry, desc)
+        for desc in DIAGNOSTIC_SENSOR_DESCRIPTIONS
+    )
+
+    # Напряжения ячеек: по фактическому числу ячеек пакета
+    cells = _CellSensors(hass, coordinator, entry, async_add_entities)
+    cells.async_update()
+    entry.async_on_unload(coordinator.async_add_listener(cells.async_update))
+
+    # Сенсоры по всем батареям создаёт первая загруженная запись; если она
+    # уйдёт, флот добавит их через платформу другой записи
+    fleet = async_get_fleet(hass)
+
+    @callback
+    def _async_add_fleet_sensors() -> None:
+        async_add_entities(
+            FelicityFleetSensor(fleet, desc) for desc in FLEET_SENSOR_DESCRIPTIONS
+        )
+
+    if fleet.add_platform(entry.entry_id, _async_add_fleet_sensors):
+        await fleet.async_refresh()
+        _async_add_fleet_sensors()
+
     async_add_entities(entities)
 
 
-class FelicitySensor(CoordinatorEntity, SensorEntity):
+class _CellSensors:
+    """One voltage sensor per cell the pack reports.
+
+    Sensors are added as soon as more cells report a voltage. A cell that
+    has reported a voltage during this run keeps its sensor as long as the
+    BMS still has a slot for it, even if it drops to 65535 (a faulted last
+    cell must stay visible). Other surplus sensors, e.g. empty slots left
+    in the registry by an earlier version, are removed with their
+    registry entries once the smaller count has held without a break for
+    CELL_REMOVE_CONFIRM_TIME. Updates without a cell list change nothing.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: FelicityCoordinator,
+        entry: ConfigEntry,
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        self._hass = hass
+        self._coordinator = coordinator
+        self._entry = entry
+        self._async_add_entities = async_add_entities
+        self._entities: list[FelicitySensor] = []
+        self._shorter_since: float | None = None  # time.monotonic()
+        self._seen = 0  # highest cell number with a voltage this run
+        # Ячейки из реестра (прошлый запуск) создаём сразу, чтобы они не
+        # висели недоступными до подтверждения меньшего числа ячеек
+        registry = er.async_get(hass)
+        self._registered = max(
+            (
+                int(match.group(1))
+                for reg in er.async_entries_for_config_entry(registry, entry.entry_id)
+                if reg.domain == "sensor"
+                and (match := _CELL_KEY_RE.search(reg.unique_id))
+            ),
+            default=0,
+        )
+
+    @callback
+    def async_update(self) -> None:
+        snap = self._coordinator.data
+        count = len(snap.cells) if snap is not None else 0
+        if self._registered:
+            self._add(self._registered)
+            self._registered = 0
+        if not count or not self._coordinator.last_update_success:
+            return
+        self._seen = max(self._seen, count)
+        # Ячейка, уже показавшая напряжение, остаётся, пока для неё есть слот
+        keep = max(count, min(self._seen, snap.cell_slots))
+        if keep >= len(self._entities):
+            self._shorter_since = None
+            self._add(keep)
+            return
+        now = time.monotonic()
+        if self._shorter_since is None:
+            self._shorter_since = now
+        elif now - self._shorter_since >= CELL_REMOVE_CONFIRM_TIME:
+            self._shorter_since = None
+            self._remove_from(keep)
+
+    def _add(self, count: int) -> None:
+        new = [
+            FelicitySensor(self._coordinator, self._entry, _cell_description(n))
+            for n in range(len(self._entities) + 1, count + 1)
+        ]
+        if new:
+            self._entities.extend(new)
+            self._async_add_entities(new)
+
+    def _remove_from(self, count: int) -> None:
+        registry = er.async_get(self._hass)
+        removed, self._entities = self._entities[count:], self._entities[:count]
+        for entity in removed:
+            if entity.entity_id and registry.async_get(entity.entity_id):
+                # Сущность сама снимается с платформы при удалении из реестра
+                registry.async_remove(entity.entity_id)
+            else:
+                self._hass.async_create_task(entity.async_remove())
+
+
+class FelicitySensor(FelicityEntity, SensorEntity):
     """Representation of a Felicity sensor."""
 
-    _attr_has_entity_name = True
+    entity_description: FelicitySensorDescription
+
+    # Отложенная запись значения, придержанного deadband
+    _heartbeat: CALLBACK_TYPE | None = None
 
     def __init__(
         self,
@@ -503,302 +802,176 @@ class FelicitySensor(CoordinatorEntity, SensorEntity):
         entry: ConfigEntry,
         description: FelicitySensorDescription,
     ) -> None:
-        super().__init__(coordinator)
-        self.entity_description = description
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        super().__init__(coordinator, entry, description)
+        self._deadband = description.resolved_deadband()
+        self._max_age = description.max_age
+        self._section = description.section
+
+    def _skip_write(self, state: tuple[Any, Any, Any]) -> bool:
+        """Also skip changes smaller than the deadband (up to max_age)."""
+        if super()._skip_write(state):
+            return True
+        last = self._last_written
+        if self._deadband is None or last is None:
+            return False
+        available, value, attrs = state
+        last_available, last_value, last_attrs = last
+        if available != last_available or attrs != last_attrs:
+            return False
+        if not isinstance(value, (int, float)) or not isinstance(
+            last_value, (int, float)
+        ):
+            return False
+        # Переход в ноль/из нуля всегда пишем (начало/конец заряда)
+        if (value == 0) != (last_value == 0):
+            return False
+        if abs(value - last_value) >= self._deadband:
+            return False
+        held = self._max_age - (time.monotonic() - self._last_write_at)
+        if held <= 0:
+            return False
+        # Неизменные ответы не оповещают сущности: придержанное значение
+        # записываем по таймеру, не позже max_age
+        if self._heartbeat is None:
+            self._heartbeat = async_call_later(self.hass, held, self._async_heartbeat)
+        return True
+
+    @callback
+    def _async_heartbeat(self, _now: datetime) -> None:
+        self._heartbeat = None
+        self._handle_coordinator_update()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a pending deadband write."""
+        await super().async_will_remove_from_hass()
+        if self._heartbeat is not None:
+            self._heartbeat()
+            self._heartbeat = None
 
     @property
-    def device_info(self) -> dict[str, Any]:
-        """Return device info to group entities into one device."""
-        data = self.coordinator.data or {}
-        serial = data.get("DevSN") or data.get("wifiSN") or self._entry.entry_id
-        basic = data.get("_basic") or {}
-        sw_version = basic.get("version")
-        host = self._entry.data.get(CONF_HOST)
-        serial_display = f"{serial} ({host})" if host else serial
-
-
-        return {
-            "identifiers": {(DOMAIN, serial)},
-            "name": self._entry.data.get("name", "Felicity Battery"),
-            "manufacturer": "Felicity",
-            "model": "FLA48200",
-            "sw_version": sw_version,
-            "serial_number": serial_display,
-        }
+    def native_value(self) -> Any:
+        """Return the native value of the entity."""
+        return self._current_value()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Add ``stale`` while the cached section could not be re-read."""
+        attrs = super().extra_state_attributes
+        snap = self.coordinator.data
+        if self._section is not None and snap is not None:
+            if self._section in snap.stale_sections:
+                attrs = {**(attrs or {}), ATTR_STALE: True}
+        return attrs
+
+
+class FelicityCellDriftSensor(FelicitySensor):
+    """Cell drift with every cell voltage in an unrecorded attribute.
+
+    The ``cells`` list is left out of the write decision: it is published
+    with the next write caused by the drift or the min/max cell, instead
+    of forcing a write whenever any cell moves by a millivolt.
+    """
+
+    _unrecorded_attributes = frozenset({ATTR_CELLS})
 
+    def _state_key(self) -> tuple[Any, Any, Any]:
+        available, value, attrs = super()._state_key()
+        if attrs and ATTR_CELLS in attrs:
+            attrs = {k: v for k, v in attrs.items() if k != ATTR_CELLS}
+        return available, value, attrs
 
 
+class FelicityInfoSensor(FelicitySensor):
+    """Freshness of the cached info/settings, with both dicts attached.
+
+    The dicts are written only when they change and are not recorded.
+    """
+
+    _unrecorded_attributes = frozenset({ATTR_BASIC, ATTR_SETTINGS})
+
+
+class FelicityEnergySensor(FelicitySensor, RestoreSensor):
+    """Charge or discharge energy total, continued across restarts."""
+
+    async def async_added_to_hass(self) -> None:
+        """Hand the total saved before the restart to the coordinator."""
+        last = await self.async_get_last_sensor_data()
+        if last is not None and isinstance(last.native_value, (int, float)):
+            total = float(last.native_value)
+            if self.entity_description.key == "charge_energy":
+                self.coordinator.restore_energy(total, None)
+            else:
+                self.coordinator.restore_energy(None, total)
+        await super().async_added_to_hass()
+
+
+class FelicityDiagnosticSensor(FelicityEntity, SensorEntity):
+    """Poll-cycle metric of the integration itself.
+
+    Stays available while the battery is unreachable, so the failure rate
+    remains visible during an outage.
+    """
+
+    entity_description: FelicityDiagnosticSensorDescription
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Also update after failed polls (breaker state, failure rate)."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_poll_listener(self._handle_coordinator_update)
+        )
+
+    def _current_value(self) -> Any:
+        return self._value_fn(self.coordinator)
+
     @property
     def native_value(self) -> Any:
         """Return the native value of the entity."""
-        data: dict = self.coordinator.data or {}
-        key = self.entity_description.key
-
-        def get_nested(path: tuple[Any, ...]):
-            cur: Any = data
-            try:
-                for p in path:
-                    cur = cur[p]
-                return cur
-            except (KeyError, IndexError, TypeError):
-                return None
-
-        # --- Runtime telemetry ---
-        if key == "soc":
-            raw = get_nested(("Batsoc", 0, 0))
-            return round(raw / 100, 1) if raw is not None else None
-
-        if key == "voltage":
-            raw = get_nested(("Batt", 0, 0))
-            return round(raw / 1000, 2) if raw is not None else None
-
-        if key == "current":
-            raw = get_nested(("Batt", 1, 0))
-            return round(raw / 10, 1) if raw is not None else None
-
-        if key == "power":
-            v_raw = get_nested(("Batt", 0, 0))
-            i_raw = get_nested(("Batt", 1, 0))
-            if v_raw is None or i_raw is None:
-                return None
-            v = v_raw / 1000
-            i = i_raw / 10
-            return round(v * i)
-
-        if key == "charge_current":
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is None:
-                return None
-            current = i_raw / 10.0
-            return round(current, 1) if current > 0 else 0.0
-
-        if key == "discharge_current":
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is None:
-                return None
-            current = i_raw / 10.0
-            return round(-current, 1) if current < 0 else 0.0
-
-        if key == "charge_power":
-            v_raw = get_nested(("Batt", 0, 0))
-            i_raw = get_nested(("Batt", 1, 0))
-            if v_raw is None or i_raw is None:
-                return None
-            v = v_raw / 1000.0
-            i = i_raw / 10.0
-            p = v * i
-            return round(p) if p > 0 else 0
-
-        if key == "discharge_power":
-            v_raw = get_nested(("Batt", 0, 0))
-            i_raw = get_nested(("Batt", 1, 0))
-            if v_raw is None or i_raw is None:
-                return None
-            v = v_raw / 1000.0
-            i = i_raw / 10.0
-            p = v * i
-            return round(-p) if p < 0 else 0
-
-        if key == "direction":
-            i_raw = get_nested(("Batt", 1, 0))
-            if i_raw is not None:
-                current = i_raw / 10.0
-                if current > 0.05:
-                    return "charging"
-                if current < -0.05:
-                    return "discharging"
-            code = data.get("Estate")
-            if code == 9152:
-                return "charging"
-            if code == 5056:
-                return "discharging"
-            if code in (960, 320):
-                return "idle"
-            return "idle"
-
-        if key == "temp1":
-            raw = get_nested(("BTemp", 0, 0))
-            return round(raw / 10, 1) if raw is not None else None
-
-        if key == "temp2":
-            raw = get_nested(("BTemp", 0, 1))
-            return round(raw / 10, 1) if raw is not None else None
-
-        if key == "max_cell_v":
-            raw = get_nested(("BMaxMin", 0, 0))
-            return round(raw / 1000, 3) if raw is not None else None
-
-        if key == "min_cell_v":
-            raw = get_nested(("BMaxMin", 0, 1))
-            return round(raw / 1000, 3) if raw is not None else None
-
-        if key == "cell_drift":
-            max_raw = get_nested(("BMaxMin", 0, 0))
-            min_raw = get_nested(("BMaxMin", 0, 1))
-            if max_raw is None or min_raw is None:
-                return None
-            return round((max_raw - min_raw) / 1000, 3)
-
-        # --- Cell voltages 1–16 ---
-        if key.startswith("cell_") and key.endswith("_v"):
-            try:
-                idx = int(key.split("_")[1]) - 1  # 0..15
-            except (ValueError, IndexError):
-                return None
-            raw = get_nested(("BatcelList", 0, idx))
-            if raw is None or raw == 65535:
-                return None
-            # мВ -> В, три знака
-            return round(raw / 1000.0, 3)
-
-        # --- Limits from runtime data ---
-        if key == "max_charge_current":
-            raw = get_nested(("LVolCur", 1, 0))
-            return round(raw / 10, 1) if raw is not None else None
-
-        if key == "max_discharge_current":
-            raw = get_nested(("LVolCur", 1, 1))
-            return round(raw / 10, 1) if raw is not None else None
-
-        if key == "state":
-            code = data.get("Estate")
-            if code is None:
-                return None
-            if code == 320:
-                return "full"
-            if code == 960:
-                return "standby"
-            if code == 9152:
-                return "charging"
-            if code == 5056:
-                return "discharging"
-            return f"unknown({code})"
-
-        if key == "fault":
-            v = data.get("Bfault")
-            if v is None:
-                return None
-            return int(v)
-
-        if key == "warning":
-            v = data.get("Bwarn")
-            if v is None:
-                return None
-            return int(v)
-
-        # --- Basic info / firmware / type ---
-        basic = data.get("_basic") or {}
-        settings = data.get("_settings") or {}
-
-        if key == "fw_version":
-            return basic.get("version")
-
-        if key == "bms_m1_fw":
-            return basic.get("M1SwVer")
-
-        if key == "bms_m2_fw":
-            return basic.get("M2SwVer")
-
-        if key == "battery_type":
-            return basic.get("Type")
-
-        if key == "battery_subtype":
-            return basic.get("SubType")
-
-        if key == "serial":
-            return data.get("DevSN") or data.get("wifiSN")
-
-        if key == "wifi_serial":
-            return data.get("wifiSN")
-
-        # --- Settings / thresholds ---
-        if key == "ttl_pack":
-            return settings.get("ttlPack")
-
-        if key == "cell_v_80":
-            raw = settings.get("wCVP80")
-            return round(raw / 1000, 3) if isinstance(raw, (int, float)) else None
-
-        if key == "cell_v_20":
-            raw = settings.get("wCVP20")
-            return round(raw / 1000, 3) if isinstance(raw, (int, float)) else None
-
-        if key == "cell_over_voltage":
-            raw = settings.get("cVolHi")
-            return round(raw / 1000, 3) if isinstance(raw, (int, float)) else None
-
-        if key == "cell_under_voltage":
-            raw = settings.get("cVolLo")
-            return round(raw / 1000, 3) if isinstance(raw, (int, float)) else None
-
-        if key == "charge_limit_setting":
-            raw = settings.get("bCCHi2")
-            return round(raw / 10, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "discharge_limit_setting":
-            raw = settings.get("bDCHi2")
-            return round(raw / 10, 1) if isinstance(raw, (int, float)) else None
-
-        return None
+        return self._current_value()
 
     @property
     def extra_state_attributes(self) -> dict[str, Any] | None:
-        """Return extra attributes for some sensors."""
-        data: dict = self.coordinator.data or {}
-        key = self.entity_description.key
-
-        # Агрегация по ячейкам для сенсора cell_drift
-        if key == "cell_drift":
-            attrs: dict[str, Any] = {}
-            cells_list = data.get("BatcelList")
-            if (
-                isinstance(cells_list, list)
-                and cells_list
-                and isinstance(cells_list[0], list)
-            ):
-                raw_cells = cells_list[0]
-                cells_v: list[float] = []
-                for c in raw_cells:
-                    if isinstance(c, int) and c != 65535:
-                        cells_v.append(round(c / 1000.0, 3))
-                if cells_v:
-                    attrs["cells"] = cells_v
-                    max_v = max(cells_v)
-                    min_v = min(cells_v)
-                    attrs["max_cell_voltage"] = max_v
-                    attrs["min_cell_voltage"] = min_v
-                    attrs["max_cell_index"] = cells_v.index(max_v) + 1
-                    attrs["min_cell_index"] = cells_v.index(min_v) + 1
-            return attrs or None
-
-        if key in {
-            "fw_version",
-            "bms_m1_fw",
-            "bms_m2_fw",
-            "battery_type",
-            "battery_subtype",
-            "serial",
-            "wifi_serial",
-        }:
-            basic = data.get("_basic")
-            if isinstance(basic, dict):
-                return basic
+        """Return extra attributes, if the description defines any."""
+        if self._attrs_fn is None:
             return None
+        return self._attrs_fn(self.coordinator)
 
-        if key in {
-            "ttl_pack",
-            "cell_v_80",
-            "cell_v_20",
-            "cell_over_voltage",
-            "cell_under_voltage",
-            "charge_limit_setting",
-            "discharge_limit_setting",
-        }:
-            settings = data.get("_settings")
-            if isinstance(settings, dict):
-                return settings
+
+class FelicityFleetSensor(CoordinatorEntity[FelicityFleet], SensorEntity):
+    """Aggregate over all configured batteries."""
+
+    _attr_has_entity_name = True
+    entity_description: FelicityFleetSensorDescription
+
+    def __init__(
+        self, fleet: FelicityFleet, description: FelicityFleetSensorDescription
+    ) -> None:
+        super().__init__(fleet)
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}_fleet_{description.key}"
+        self._attr_device_info = {
+            "identifiers": {FLEET_DEVICE_IDENTIFIER},
+            "name": "Felicity Fleet",
+            "manufacturer": "Felicity",
+            "model": "FLA48200 fleet",
+        }
+
+    @property
+    def native_value(self) -> Any:
+        """Return the native value of the entity."""
+        totals = self.coordinator.data
+        if totals is None:
             return None
+        return self.entity_description.value_fn(totals)
 
-        return None
\ No newline at end of file
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return how many batteries the value covers."""
+        totals = self.coordinator.data
+        if totals is None:
+            return None
+        return {"batteries": totals.batteries, "reporting": totals.reporting}
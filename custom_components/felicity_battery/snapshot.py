@@ -0,0 +1,275 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import time
+from typing import Any, Dict
+
+# Коды Estate
+ESTATE_FULL = 320
+ESTATE_STANDBY = 960
+ESTATE_CHARGING = 9152
+ESTATE_DISCHARGING = 5056
+
+ESTATE_NAMES: dict[int, str] = {
+    ESTATE_FULL: "full",
+    ESTATE_STANDBY: "standby",
+    ESTATE_CHARGING: "charging",
+    ESTATE_DISCHARGING: "discharging",
+}
+
+# BMS placeholder for a cell that is not present
+CELL_EMPTY = 65535
+
+# Ток меньше этого (по модулю, А) считаем нулевым
+IDLE_CURRENT_A = 0.05
+
+
+def _nested(data: Any, *path: Any) -> Any:
+    try:
+        for p in path:
+            data = data[p]
+        return data
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _scaled(raw: Any, divisor: float, digits: int) -> float | None:
+    if isinstance(raw, (int, float)):
+        return round(raw / divisor, digits)
+    return None
+
+
+def _cell_v(raw: Any) -> float | None:
+    if isinstance(raw, int) and raw != CELL_EMPTY:
+        return round(raw / 1000.0, 3)
+    return None
+
+
+class FelicitySnapshot:
+    """Decoded battery data, built once per coordinator refresh.
+
+    All scaling and derived values (power, direction, drift, ...) are
+    computed here, so entities only read attributes.
+
+    ``updated_at`` is the wall-clock time the data was read; ``restored``
+    marks a snapshot loaded from storage at startup rather than polled.
+    """
+
+    __slots__ = (
+        "raw",
+        "updated_at",
+        "restored",
+        "basic",
+        "settings",
+        "section_age",
+        "stale_sections",
+        # runtime telemetry
+        "soc",
+        "capacity_ah",
+        "voltage",
+        "current",
+        "power",
+        "charge_current",
+        "discharge_current",
+        "charge_power",
+        "discharge_power",
+        # energy totals, kWh (filled in by the coordinator)
+        "charge_energy",
+        "discharge_energy",
+        "direction",
+        "temp1",
+        "temp2",
+        # cells
+        "max_cell_v",
+        "min_cell_v",
+        "cell_drift",
+        "cells",
+        "cell_slots",
+        "max_charge_current",
+        "max_discharge_current",
+        # state / codes
+        "estate",
+        "state",
+        "fault",
+        "warning",
+        "fault_active",
+        "warning_active",
+        "charging",
+        "discharging",
+        "standby",
+        # info
+        "serial",
+        "wifi_serial",
+        "fw_version",
+        "bms_m1_fw",
+        "bms_m2_fw",
+        "battery_type",
+        "battery_subtype",
+        # settings / thresholds
+        "ttl_pack",
+        "cell_v_80",
+        "cell_v_20",
+        "cell_over_voltage",
+        "cell_under_voltage",
+        "charge_limit_setting",
+        "discharge_limit_setting",
+    )
+
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        updated_at: float | None = None,
+        restored: bool = False,
+    ) -> None:
+        self.raw = data
+        self.updated_at = time.time() if updated_at is None else updated_at
+        self.restored = restored
+        self.charge_energy: float | None = None
+        self.discharge_energy: float | None = None
+        basic = data.get("_basic")
+        settings = data.get("_settings")
+        self.basic: Dict[str, Any] | None = basic if isinstance(basic, dict) else None
+        self.settings: Dict[str, Any] | None = (
+            settings if isinstance(settings, dict) else None
+        )
+        # Возраст кэшированных секций (с) и секции, которые не перечитались
+        self.section_age: Dict[str, int] = data.get("_section_age") or {}
+        self.stale_sections = frozenset(data.get("_stale") or ())
+
+        # --- Runtime telemetry ---
+        v_raw = _nested(data, "Batt", 0, 0)
+        i_raw = _nested(data, "Batt", 1, 0)
+        soc_raw = _nested(data, "Batsoc", 0, 0)
+
+        self.soc = round(soc_raw / 100, 1) if soc_raw is not None else None
+        # Ёмкость пакета: Batsoc[0][2] в единицах 1/Batsoc[0][1] А·ч
+        cap_scale = _nested(data, "Batsoc", 0, 1)
+        cap_raw = _nested(data, "Batsoc", 0, 2)
+        if isinstance(cap_raw, int) and isinstance(cap_scale, int) and cap_scale > 0:
+            self.capacity_ah: float | None = cap_raw / cap_scale
+        else:
+            self.capacity_ah = None
+        self.voltage = round(v_raw / 1000, 2) if v_raw is not None else None
+
+        current: float | None = None
+        if i_raw is not None:
+            current = i_raw / 10.0
+            self.current = round(current, 1)
+            self.charge_current = round(current, 1) if current > 0 else 0.0
+            self.discharge_current = round(-current, 1) if current < 0 else 0.0
+        else:
+            self.current = None
+            self.charge_current = None
+            self.discharge_current = None
+
+        if v_raw is not None and current is not None:
+            p = v_raw / 1000.0 * current
+            self.power = round(p)
+            self.charge_power = round(p) if p > 0 else 0
+            self.discharge_power = round(-p) if p < 0 else 0
+        else:
+            self.power = None
+            self.charge_power = None
+            self.discharge_power = None
+
+        self.temp1 = _scaled(_nested(data, "BTemp", 0, 0), 10, 1)
+        self.temp2 = _scaled(_nested(data, "BTemp", 0, 1), 10, 1)
+
+        # --- Cells ---
+        max_raw = _nested(data, "BMaxMin", 0, 0)
+        min_raw = _nested(data, "BMaxMin", 0, 1)
+        self.max_cell_v = _scaled(max_raw, 1000, 3)
+        self.min_cell_v = _scaled(min_raw, 1000, 3)
+        if isinstance(max_raw, int) and isinstance(min_raw, int):
+            self.cell_drift = round((max_raw - min_raw) / 1000, 3)
+        else:
+            self.cell_drift = None
+
+        # мВ -> В, три знака; 65535 = ячейки нет. Пустые слоты в конце
+        # списка — не ячейки, их отбрасываем: len(cells) = число ячеек
+        cells = _nested(data, "BatcelList", 0)
+        cells_v = [_cell_v(c) for c in cells] if isinstance(cells, list) else []
+        # Длина списка как её сообщает BMS (вместе с пустыми слотами)
+        self.cell_slots = len(cells_v)
+        while cells_v and cells_v[-1] is None:
+            cells_v.pop()
+        self.cells: tuple[float | None, ...] = tuple(cells_v)
+
+        self.max_charge_current = _scaled(_nested(data, "LVolCur", 1, 0), 10, 1)
+        self.max_discharge_current = _scaled(_nested(data, "LVolCur", 1, 1), 10, 1)
+
+        # --- State / codes ---
+        estate = data.get("Estate")
+        self.estate = estate
+        if estate is None:
+            self.state = None
+        else:
+            self.state = ESTATE_NAMES.get(estate, f"unknown({estate})")
+
+        fault = data.get("Bfault")
+        warning = data.get("Bwarn")
+        self.fault = int(fault) if fault is not None else None
+        self.warning = int(warning) if warning is not None else None
+        self.fault_active = fault != 0 if fault is not None else None
+        self.warning_active = warning != 0 if warning is not None else None
+
+        # по коду состояния + по знаку тока
+        if current is not None and current > IDLE_CURRENT_A:
+            self.direction = "charging"
+        elif current is not None and current < -IDLE_CURRENT_A:
+            self.direction = "discharging"
+        elif estate == ESTATE_CHARGING:
+            self.direction = "charging"
+        elif estate == ESTATE_DISCHARGING:
+            self.direction = "discharging"
+        else:
+            self.direction = "idle"
+
+        if estate == ESTATE_CHARGING:
+            self.charging = True
+        else:
+            self.charging = current > IDLE_CURRENT_A if current is not None else None
+        if estate == ESTATE_DISCHARGING:
+            self.discharging = True
+        else:
+            self.discharging = (
+                current < -IDLE_CURRENT_A if current is not None else None
+            )
+        if estate in (ESTATE_STANDBY, ESTATE_FULL):
+            self.standby = True
+        else:
+            self.standby = (
+                abs(current) <= IDLE_CURRENT_A if current is not None else None
+            )
+
+        # --- Info ---
+        self.serial = data.get("DevSN") or data.get("wifiSN")
+        self.wifi_serial = data.get("wifiSN")
+        basic = self.basic or {}
+        self.fw_version = basic.get("version")
+        self.bms_m1_fw = basic.get("M1SwVer")
+        self.bms_m2_fw = basic.get("M2SwVer")
+        self.battery_type = basic.get("Type")
+        self.battery_subtype = basic.get("SubType")
+
+        # --- Settings / thresholds ---
+        settings = self.settings or {}
+        self.ttl_pack = settings.get("ttlPack")
+        self.cell_v_80 = _scaled(settings.get("wCVP80"), 1000, 3)
+        self.cell_v_20 = _scaled(settings.get("wCVP20"), 1000, 3)
+        self.cell_over_voltage = _scaled(settings.get("cVolHi"), 1000, 3)
+        self.cell_under_voltage = _scaled(settings.get("cVolLo"), 1000, 3)
+        self.charge_limit_setting = _scaled(settings.get("bCCHi2"), 10, 1)
+        self.discharge_limit_setting = _scaled(settings.get("bDCHi2"), 10, 1)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the data was read from the battery."""
+        return max(0.0, time.time() - self.updated_at)
+
+    def cell(self, index: int) -> float | None:
+        """Return voltage of cell ``index`` (0-based), None if absent."""
+        try:
+            return self.cells[index]
+        except IndexError:
+            return None